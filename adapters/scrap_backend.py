@@ -1,5 +1,6 @@
 ﻿import os
 import platform
+from functools import lru_cache
 from pathlib import Path
 
 def get_backend():
@@ -15,31 +16,39 @@ def get_backend():
       - SCRAP_BACKEND=stub     -> always use stub
       - SCRAP_BACKEND=real     -> force real (will raise if not available)
       - SCRAP_BACKEND=tasklib  -> force tasklib (will raise if not available)
+
+    The implementation is resolved once per SCRAP_BACKEND value; every call returns
+    a fresh client, so trials never share signing keys or receipts.
     """
 
-    forced = os.environ.get("SCRAP_BACKEND", "").strip().lower()
+    return _backend_class(os.environ.get("SCRAP_BACKEND", "").strip().lower())()
+
+
+@lru_cache(maxsize=None)
+def _backend_class(forced: str):
     if forced == "stub":
         from .scrap_stub import ScrapClient
-        return ScrapClient()
+        return ScrapClient
     if forced == "tasklib":
         from .tasklib_backend import ScrapClient
-        return ScrapClient()
+        return ScrapClient
 
     priv = Path(__file__).resolve().parents[1] / "deps" / "scap_private"
     is_windows = platform.system().lower().startswith("win")
 
-    if forced == "real" or (is_windows and priv.exists() and any(priv.iterdir())):
+    if forced == "real" or (is_windows and priv.is_dir() and next(priv.iterdir(), None) is not None):
         from .scap_real import ScrapClient
-        return ScrapClient()
+        return ScrapClient
 
     if forced == "" and _tasklib_available():
         from .tasklib_backend import ScrapClient
-        return ScrapClient()
+        return ScrapClient
 
     from .scrap_stub import ScrapClient
-    return ScrapClient()
+    return ScrapClient
 
 
+@lru_cache(maxsize=1)
 def _tasklib_available() -> bool:
     from importlib.util import find_spec
 
@@ -1,21 +1,71 @@
 import hashlib
-import hmac
 import json
 import secrets
 import tempfile
+import weakref
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 import tasklib
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _canonical_json(payload: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(payload, sort_keys=True, default=str).encode()
+
+
+def _keyed_digest(key: bytes, blob: bytes) -> bytes:
+    """32-byte keyed MAC: BLAKE3 when installed, otherwise keyed BLAKE2b."""
+    if blake3 is not None:
+        return blake3.blake3(blob, key=key).digest()
+    return hashlib.blake2b(blob, key=key, digest_size=32).digest()
+
 
 class ScrapClient:
-    def __init__(self, data_dir: Path | None = None) -> None:
+    """SCRAP client that signs locally and logs each artifact as a TaskWarrior task.
+
+    Each task is saved as soon as it is recorded. With ``synchronous=False`` task
+    writes are buffered and sent to TaskWarrior in one ``task import`` per
+    ``batch_size`` entries; call ``flush()`` to send the rest. Anything still
+    buffered is flushed when the client is garbage collected or at interpreter
+    exit, which does not happen in terminated pool workers.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path | None = None,
+        *,
+        synchronous: bool = True,
+        batch_size: int = 256,
+    ) -> None:
         self._secret = secrets.token_bytes(32)
         self._receipts: Dict[bytes, bytes] = {}
         self._task_cache = []
+        self._pending: List[Dict[str, Any]] = []
+        self._synchronous = synchronous
+        self._batch_size = max(1, int(batch_size))
         self._temp_dir = None
-        self._tw = self._init_taskwarrior(data_dir)
+        # TaskWarrior is set up lazily on the first recorded task.
+        self._data_dir = data_dir
+        self._tw: tasklib.TaskWarrior | None = None
+        self._tw_initialized = False
+        self._import_path: Path | None = None
 
     def issue_capability_token(self, subject: str, caps: Any, constraints: Any) -> bytes:
         payload = {
@@ -58,32 +108,51 @@ class ScrapClient:
         return receipt == expected
 
     def _sign_payload(self, prefix: bytes, payload: Dict[str, Any]) -> bytes:
-        blob = json.dumps(payload, sort_keys=True, default=str).encode()
-        digest = hmac.new(self._secret, blob, hashlib.sha256).digest()
+        blob = _canonical_json(payload)
+        digest = _keyed_digest(self._secret, blob)
         return prefix + digest
 
     def _init_taskwarrior(self, data_dir: Path | None) -> tasklib.TaskWarrior | None:
+        temp_dir = None
         resolved_dir = data_dir
         if resolved_dir is None:
-            self._temp_dir = tempfile.TemporaryDirectory(prefix="scrap_tasklib_")
-            resolved_dir = Path(self._temp_dir.name)
+            temp_dir = tempfile.TemporaryDirectory(prefix="scrap_tasklib_")
+            resolved_dir = Path(temp_dir.name)
         resolved_dir.mkdir(parents=True, exist_ok=True)
         taskrc_path = resolved_dir / "taskrc"
         taskrc_path.write_text(f"data.location={resolved_dir}\n", encoding="utf-8")
         try:
-            return tasklib.TaskWarrior(
+            tw = tasklib.TaskWarrior(
                 data_location=str(resolved_dir),
                 taskrc_location=str(taskrc_path),
                 create=True,
             )
         except Exception:
+            if temp_dir is not None:
+                temp_dir.cleanup()
             return None
+        self._temp_dir = temp_dir
+        self._import_path = resolved_dir / "scrap_import.json"
+        # The finalizer holds no reference to self, so the client can still be collected.
+        weakref.finalize(self, _close, tw, self._import_path, self._pending, self._task_cache, temp_dir)
+        return tw
+
+    def _ensure_taskwarrior(self) -> tasklib.TaskWarrior | None:
+        if not self._tw_initialized:
+            self._tw = self._init_taskwarrior(self._data_dir)
+            self._tw_initialized = True
+        return self._tw
 
     def _record_task(self, kind: str, payload: Dict[str, Any]) -> None:
         entry = {"kind": kind, "payload": payload}
-        if self._tw is None:
+        if self._ensure_taskwarrior() is None:
             self._task_cache.append(entry)
             return
+        if not self._synchronous:
+            self._pending.append(entry)
+            if len(self._pending) >= self._batch_size:
+                self.flush()
+            return
         try:
             task = self._tw.tasks.add(description=f"SCRAP {kind}")
             task["tags"] = ["scrap", kind]
@@ -92,6 +161,53 @@ class ScrapClient:
         except Exception:
             self._task_cache.append(entry)
 
-    def __del__(self) -> None:
-        if self._temp_dir is not None:
-            self._temp_dir.cleanup()
+    def flush(self) -> None:
+        """Write buffered task entries to TaskWarrior with a single bulk import."""
+        if not self._pending:
+            return
+        _import_tasks(self._tw, self._import_path, self._pending, self._task_cache)
+
+
+def _import_tasks(tw: tasklib.TaskWarrior, import_path: Path, pending: List[Dict[str, Any]], task_cache: list) -> None:
+    """Import and clear ``pending`` via ``task import``; failed entries go to ``task_cache``."""
+    batch = pending[:]
+    pending.clear()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    tasks = [
+        {
+            "description": f"SCRAP {entry['kind']}",
+            "status": "pending",
+            "entry": stamp,
+            "tags": ["scrap", entry["kind"]],
+            "annotations": [
+                {
+                    "entry": stamp,
+                    "description": json.dumps(entry["payload"], sort_keys=True, default=str),
+                }
+            ],
+        }
+        for entry in batch
+    ]
+    try:
+        import_path.write_text(json.dumps(tasks), encoding="utf-8")
+        tw.execute_command(["import", str(import_path)])
+    except Exception:
+        task_cache.extend(batch)
+    finally:
+        import_path.unlink(missing_ok=True)
+
+
+def _close(
+    tw: tasklib.TaskWarrior,
+    import_path: Path,
+    pending: List[Dict[str, Any]],
+    task_cache: list,
+    temp_dir: tempfile.TemporaryDirectory | None,
+) -> None:
+    """Finalizer: import what is still buffered, then drop the temporary data dir."""
+    try:
+        if pending:
+            _import_tasks(tw, import_path, pending, task_cache)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
@@ -5,88 +5,118 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+from array import array
+from dataclasses import dataclass, field
 from pathlib import Path
 from statistics import median
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, Union
 
+try:
+    import orjson
 
-def _read_events(path: Path) -> List[dict]:
-    events = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if line.strip():
-            events.append(json.loads(line))
-    return events
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 
-def _latencies(events: Iterable[dict]) -> List[int]:
-    created: Dict[int, int] = {}
-    completed: Dict[int, int] = {}
-    for ev in events:
-        if ev["event"] == "task_created":
-            created[ev["task_id"]] = ev["t"]
-        if ev["event"] == "task_completed":
-            completed[ev["task_id"]] = ev["t"]
-    latencies = []
-    for task_id, t0 in created.items():
-        if task_id in completed:
-            latencies.append(completed[task_id] - t0)
-    return latencies
+def _iter_events(path: Path) -> Iterator[dict]:
+    with path.open("rb") as handle:
+        for line in handle:
+            if line.strip():
+                yield _loads(line)
 
 
-def _percentile(values: List[int], pct: float) -> float:
+def _sorted_percentile(values: Sequence[int], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
     if not values:
         return 0.0
-    values = sorted(values)
     idx = int(round((pct / 100) * (len(values) - 1)))
     return float(values[idx])
 
 
-def _deadline_miss_rate(events: Iterable[dict]) -> float:
-    created = {ev["task_id"] for ev in events if ev["event"] == "task_created"}
-    missed = {ev["task_id"] for ev in events if ev["event"] == "deadline_miss"}
-    if not created:
-        return 0.0
-    return len(missed) / len(created)
-
-
-def _throughput(events: Iterable[dict], duration_steps: int) -> float:
-    completed = {ev["task_id"] for ev in events if ev["event"] == "task_completed"}
-    if duration_steps <= 0:
-        return 0.0
-    return len(completed)
-
-
-def _tasks_blocked_ground(events: Iterable[dict]) -> int:
-    created = {}
-    dispatched = {}
-    for ev in events:
-        if ev["event"] == "task_created":
-            created[ev["task_id"]] = ev["t"]
-        if ev["event"] == "task_dispatched":
-            dispatched.setdefault(ev["task_id"], ev["t"])
-    blocked = 0
-    for task_id, t0 in created.items():
-        t1 = dispatched.get(task_id)
-        if t1 is not None and t1 > t0:
-            blocked += 1
-    return blocked
-
-
-def _isl_message_count(events: Iterable[dict]) -> int:
-    return sum(1 for ev in events if ev["event"] == "task_forwarded")
-
-
-def compute_metrics(events: List[dict], duration_steps: int, mode: str) -> Dict[str, float]:
-    latencies = _latencies(events)
+@dataclass
+class EventIndex:
+    """Per-task aggregates of one log, built in a single pass over its events.
+
+    Metrics that only depend on the log (latencies, ground blocking) are computed
+    lazily and memoized, so re-running compute_metrics with different parameters
+    does not rescan anything.
+    """
+
+    created: Dict[int, int] = field(default_factory=dict)
+    completed: Dict[int, int] = field(default_factory=dict)
+    dispatched: Dict[int, int] = field(default_factory=dict)
+    missed: Set[int] = field(default_factory=set)
+    forwarded_count: int = 0
+    _latencies: Optional[array] = field(default=None, init=False, repr=False)
+    _blocked: Optional[int] = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict]) -> "EventIndex":
+        created: Dict[int, int] = {}
+        completed: Dict[int, int] = {}
+        dispatched: Dict[int, int] = {}
+        missed: Set[int] = set()
+        forwarded = 0
+        for ev in events:
+            kind = ev["event"]
+            if kind == "task_created":
+                created[ev["task_id"]] = ev["t"]
+            elif kind == "task_completed":
+                completed[ev["task_id"]] = ev["t"]
+            elif kind == "task_dispatched":
+                dispatched.setdefault(ev["task_id"], ev["t"])
+            elif kind == "deadline_miss":
+                missed.add(ev["task_id"])
+            elif kind == "task_forwarded":
+                forwarded += 1
+        return cls(
+            created=created,
+            completed=completed,
+            dispatched=dispatched,
+            missed=missed,
+            forwarded_count=forwarded,
+        )
+
+    @property
+    def latencies(self) -> array:
+        """Sorted create->complete latencies of completed tasks, as a packed int64 array."""
+        if self._latencies is None:
+            completed = self.completed
+            self._latencies = array(
+                "q", sorted(completed[tid] - t0 for tid, t0 in self.created.items() if tid in completed)
+            )
+        return self._latencies
+
+    @property
+    def blocked_waiting_ground(self) -> int:
+        """Tasks whose first dispatch happened after the step they were created."""
+        if self._blocked is None:
+            dispatched = self.dispatched
+            blocked = 0
+            for tid, t0 in self.created.items():
+                t1 = dispatched.get(tid)
+                if t1 is not None and t1 > t0:
+                    blocked += 1
+            self._blocked = blocked
+        return self._blocked
+
+
+def compute_metrics(
+    events: Union[Iterable[dict], EventIndex], duration_steps: int, mode: str
+) -> Dict[str, float]:
+    index = events if isinstance(events, EventIndex) else EventIndex.from_events(events)
+    latencies = index.latencies
+    n_created = len(index.created)
     return {
         "mode": mode,
-        "p50_latency": _percentile(latencies, 50),
-        "p90_latency": _percentile(latencies, 90),
-        "p99_latency": _percentile(latencies, 99),
-        "deadline_miss_rate": _deadline_miss_rate(events),
-        "throughput": _throughput(events, duration_steps),
-        "blocked_waiting_ground": _tasks_blocked_ground(events) if mode == "A" else 0,
-        "isl_message_count": _isl_message_count(events) if mode == "B" else 0,
+        "p50_latency": _sorted_percentile(latencies, 50),
+        "p90_latency": _sorted_percentile(latencies, 90),
+        "p99_latency": _sorted_percentile(latencies, 99),
+        "deadline_miss_rate": len(index.missed) / n_created if n_created else 0.0,
+        "throughput": len(index.completed) if duration_steps > 0 else 0.0,
+        "blocked_waiting_ground": index.blocked_waiting_ground if mode == "A" else 0,
+        "isl_message_count": index.forwarded_count if mode == "B" else 0,
     }
 
 
@@ -98,11 +128,8 @@ def main() -> None:
     ap.add_argument("--out-csv", type=str, default="runs/summary.csv")
     args = ap.parse_args()
 
-    events_a = _read_events(Path(args.mode_a))
-    events_b = _read_events(Path(args.mode_b))
-
-    metrics_a = compute_metrics(events_a, args.duration_steps, "A")
-    metrics_b = compute_metrics(events_b, args.duration_steps, "B")
+    metrics_a = compute_metrics(_iter_events(Path(args.mode_a)), args.duration_steps, "A")
+    metrics_b = compute_metrics(_iter_events(Path(args.mode_b)), args.duration_steps, "B")
 
     print("mode p50 p90 p99 miss_rate throughput blocked_wait_ground isl_msgs")
     print(
@@ -7,73 +7,74 @@ import csv
 from pathlib import Path
 
 
-def load_summary(path: Path) -> list[dict]:
-    with path.open(encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        return list(reader)
-
-
-def render_svg(rows: list[dict], output_path: Path) -> None:
+def load_summary(path: Path) -> tuple[list[str], list[float], list[float]]:
+    """Return the (mode, p90_latency, deadline_miss_rate) columns of a summary CSV."""
+    modes: list[str] = []
+    p90: list[float] = []
+    miss: list[float] = []
+    with path.open(encoding="utf-8", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            return modes, p90, miss
+        mode_col = header.index("mode")
+        p90_col = header.index("p90_latency")
+        miss_col = header.index("deadline_miss_rate")
+        for row in reader:
+            if not row:
+                continue
+            modes.append(row[mode_col])
+            p90.append(float(row[p90_col]))
+            miss.append(float(row[miss_col]))
+    return modes, p90, miss
+
+
+def render_svg(modes: list[str], p90: list[float], miss: list[float], output_path: Path) -> None:
     width = 640
     height = 360
     margin = 40
     bar_width = 80
     gap = 60
 
-    modes = [row["mode"] for row in rows]
-    p90 = [float(row["p90_latency"]) for row in rows]
-    miss = [float(row["deadline_miss_rate"]) for row in rows]
-
     max_p90 = max(p90) if p90 else 1.0
     max_miss = max(miss) if miss else 1.0
 
-    def bar_height(value: float, max_value: float, scale: float) -> float:
-        if max_value <= 0:
-            return 0.0
-        return (value / max_value) * scale
-
     chart_height = height - 2 * margin
     p90_scale = chart_height * 0.45
     miss_scale = chart_height * 0.45
+    p90_base = margin + p90_scale
+    miss_base = margin + p90_scale + 20 + miss_scale
+    label_y = height - margin + 15
+    legend_x = width - 180
+    legend_y = margin + p90_scale + 10
 
-    svg_lines = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">',
-        '<rect width="100%" height="100%" fill="white"/>',
-        f'<text x="{margin}" y="{margin - 10}" font-size="14" font-family="Arial">Experiment 001 Summary</text>',
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">\n'
+        '<rect width="100%" height="100%" fill="white"/>\n'
+        f'<text x="{margin}" y="{margin - 10}" font-size="14" font-family="Arial">Experiment 001 Summary</text>\n'
     ]
 
     for idx, mode in enumerate(modes):
         x0 = margin + idx * (bar_width * 2 + gap)
-        p90_h = bar_height(p90[idx], max_p90, p90_scale)
-        miss_h = bar_height(miss[idx], max_miss, miss_scale)
-
-        p90_y = margin + p90_scale - p90_h
-        miss_y = margin + p90_scale + 20 + miss_scale - miss_h
-
-        svg_lines.append(f'<rect x="{x0}" y="{p90_y}" width="{bar_width}" height="{p90_h}" fill="#4C78A8"/>')
-        svg_lines.append(
-            f'<rect x="{x0 + bar_width + 10}" y="{miss_y}" width="{bar_width}" height="{miss_h}" fill="#F58518"/>'
-        )
-        svg_lines.append(
-            f'<text x="{x0}" y="{height - margin + 15}" font-size="12" font-family="Arial">Mode {mode}</text>'
+        p90_h = (p90[idx] / max_p90) * p90_scale if max_p90 > 0 else 0.0
+        miss_h = (miss[idx] / max_miss) * miss_scale if max_miss > 0 else 0.0
+        parts.append(
+            f'<rect x="{x0}" y="{p90_base - p90_h}" width="{bar_width}" height="{p90_h}" fill="#4C78A8"/>\n'
+            f'<rect x="{x0 + bar_width + 10}" y="{miss_base - miss_h}" width="{bar_width}" height="{miss_h}" '
+            'fill="#F58518"/>\n'
+            f'<text x="{x0}" y="{label_y}" font-size="12" font-family="Arial">Mode {mode}</text>\n'
         )
 
-    legend_y = margin + p90_scale + 10
-    svg_lines.append(f'<rect x="{width - 180}" y="{legend_y}" width="12" height="12" fill="#4C78A8"/>')
-    svg_lines.append(
-        f'<text x="{width - 160}" y="{legend_y + 10}" font-size="12" font-family="Arial">p90 latency</text>'
+    parts.append(
+        f'<rect x="{legend_x}" y="{legend_y}" width="12" height="12" fill="#4C78A8"/>\n'
+        f'<text x="{legend_x + 20}" y="{legend_y + 10}" font-size="12" font-family="Arial">p90 latency</text>\n'
+        f'<rect x="{legend_x}" y="{legend_y + 20}" width="12" height="12" fill="#F58518"/>\n'
+        f'<text x="{legend_x + 20}" y="{legend_y + 30}" font-size="12" font-family="Arial">deadline miss rate</text>\n'
+        "</svg>"
     )
-    svg_lines.append(
-        f'<rect x="{width - 180}" y="{legend_y + 20}" width="12" height="12" fill="#F58518"/>'
-    )
-    svg_lines.append(
-        f'<text x="{width - 160}" y="{legend_y + 30}" font-size="12" font-family="Arial">deadline miss rate</text>'
-    )
-
-    svg_lines.append("</svg>")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text("\n".join(svg_lines), encoding="utf-8")
+    output_path.write_text("".join(parts), encoding="utf-8")
 
 
 def main() -> None:
@@ -82,8 +83,8 @@ def main() -> None:
     ap.add_argument("--out", type=str, default="runs/summary.svg")
     args = ap.parse_args()
 
-    rows = load_summary(Path(args.summary))
-    render_svg(rows, Path(args.out))
+    modes, p90, miss = load_summary(Path(args.summary))
+    render_svg(modes, p90, miss, Path(args.out))
 
 
 if __name__ == "__main__":
@@ -3,10 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Sequence
 
 
-@dataclass
+@dataclass(slots=True)
 class HypatiaPacket:
     src: bytes
     dst: bytes
@@ -31,6 +31,14 @@ class HypatiaTransport:
         self.metrics = metrics
         self._receivers: Dict[bytes, Callable[[bytes, bytes, bytes, dict], None]] = {}
 
+        # Resolve optional simulator/metrics hooks once instead of probing per packet.
+        self._has_now = hasattr(hypatia_sim, "now")
+        self._sim_can_send = getattr(hypatia_sim, "can_send", None)
+        self._sim_step = getattr(hypatia_sim, "step", None)
+        self._on_inject_hook = getattr(metrics, "on_inject", None)
+        self._on_deliver_hook = getattr(metrics, "on_deliver", None)
+        self._on_drop_hook = getattr(metrics, "on_drop", None)
+
         self.hypatia.on_delivery(self._on_delivery)
         if hasattr(self.hypatia, "on_drop"):
             self.hypatia.on_drop(self._on_drop)
@@ -42,38 +50,77 @@ class HypatiaTransport:
         self.register_receiver(dst, cb)
 
     def can_send(self, src: bytes, dst: bytes, meta: Optional[dict] = None) -> bool:
-        if hasattr(self.hypatia, "can_send"):
-            return bool(self.hypatia.can_send(src, dst, meta or {}))
+        if self._sim_can_send is not None:
+            return bool(self._sim_can_send(src, dst, meta or {}))
         return True
 
     def step(self, n: int = 1) -> None:
-        if hasattr(self.hypatia, "step"):
-            self.hypatia.step(n)
+        if self._sim_step is not None:
+            self._sim_step(n)
+
+    def send(
+        self,
+        *,
+        src: bytes,
+        dst: bytes,
+        payload: bytes,
+        meta: Optional[dict] = None,
+        own_meta: bool = False,
+    ) -> None:
+        """Inject a packet. Pass own_meta=True to hand over meta without a defensive copy."""
+        now = int(self.hypatia.now) if self._has_now else None
+        pkt = self._packet(src, dst, payload, meta, own_meta, now)
+        if self._on_inject_hook is not None:
+            self._on_inject_hook(pkt)
+        self.hypatia.inject_packet(pkt)
 
-    def send(self, *, src: bytes, dst: bytes, payload: bytes, meta: Optional[dict] = None) -> None:
+    def send_many(
+        self,
+        srcs: Sequence[bytes],
+        dsts: Sequence[bytes],
+        payloads: Sequence[bytes],
+        metas: Optional[Sequence[Optional[dict]]] = None,
+        *,
+        own_meta: bool = False,
+    ) -> None:
+        """Inject a batch of packets at the current time; same per-packet semantics as send()."""
+        if metas is None:
+            metas = [None] * len(srcs)
+        if not len(srcs) == len(dsts) == len(payloads) == len(metas):
+            raise ValueError("send_many() needs srcs, dsts, payloads and metas of equal length.")
+        now = int(self.hypatia.now) if self._has_now else None
+        packet = self._packet
+        on_inject = self._on_inject_hook
+        inject = self.hypatia.inject_packet
+        for src, dst, payload, meta in zip(srcs, dsts, payloads, metas):
+            pkt = packet(src, dst, payload, meta, own_meta, now)
+            if on_inject is not None:
+                on_inject(pkt)
+            inject(pkt)
+
+    @staticmethod
+    def _packet(
+        src: bytes, dst: bytes, payload: bytes, meta: Optional[dict], own_meta: bool, now: Optional[int]
+    ) -> HypatiaPacket:
         if meta is None:
             meta = {}
-        meta = dict(meta)
-
-        if "t_inject" not in meta and hasattr(self.hypatia, "now"):
-            meta["t_inject"] = int(getattr(self.hypatia, "now"))
-
-        pkt = HypatiaPacket(src=src, dst=dst, payload=payload, meta=meta)
-        if self.metrics is not None and hasattr(self.metrics, "on_inject"):
-            self.metrics.on_inject(pkt)
-        self.hypatia.inject_packet(pkt)
+        elif not own_meta:
+            meta = dict(meta)
+        if now is not None and "t_inject" not in meta:
+            meta["t_inject"] = now
+        return HypatiaPacket(src=src, dst=dst, payload=payload, meta=meta)
 
     def _on_delivery(self, pkt: HypatiaPacket) -> None:
-        if "t_deliver" not in pkt.meta and hasattr(self.hypatia, "now"):
-            pkt.meta["t_deliver"] = int(getattr(self.hypatia, "now"))
+        if "t_deliver" not in pkt.meta and self._has_now:
+            pkt.meta["t_deliver"] = int(self.hypatia.now)
 
-        if self.metrics is not None and hasattr(self.metrics, "on_deliver"):
-            self.metrics.on_deliver(pkt)
+        if self._on_deliver_hook is not None:
+            self._on_deliver_hook(pkt)
 
         cb = self._receivers.get(pkt.dst)
         if cb is not None:
             cb(pkt.src, pkt.dst, pkt.payload, pkt.meta)
 
     def _on_drop(self, pkt: HypatiaPacket, reason: str = "") -> None:
-        if self.metrics is not None and hasattr(self.metrics, "on_drop"):
-            self.metrics.on_drop(pkt, reason)
+        if self._on_drop_hook is not None:
+            self._on_drop_hook(pkt, reason)
@@ -1,20 +1,107 @@
 import ctypes
 import os
+import threading
+from typing import Dict, Optional
 
-def load():
+# Output buffer size for token/request/receipt blobs (SHA-256 sized plus a tag prefix).
+_OUT_CAP = 256
+
+# Byte-oriented SCAP operations exported by libscap_ffi. Each one takes two input
+# buffers and writes its result into a caller-provided output buffer, returning
+# the number of bytes written (negative on error):
+#   ssize_t op(const uint8_t *a, size_t a_len, const uint8_t *b, size_t b_len,
+#              uint8_t *out, size_t out_cap)
+_OPS = ("scap_issue_token", "scap_make_request", "scap_make_receipt")
+_VERIFY = "scap_verify_receipt"
+
+
+def _lib_path() -> str:
     lib_path = os.environ.get(
         "SCAP_FFI_LIB",
         os.path.join("vendor", "tasklib", "target", "release", "libscap_ffi.so"),
     )
-    lib_path = os.path.abspath(lib_path)
+    return os.path.abspath(lib_path)
+
 
-    lib = ctypes.CDLL(lib_path)
+_LIBS: Dict[str, ctypes.CDLL] = {}
+_LOCK = threading.Lock()
 
-    # set known signatures
-    lib.scap_version.restype = ctypes.c_char_p
 
+def _bind_signatures(lib) -> None:
+    # set known signatures; missing exports are left for load_ops() to report
+    if hasattr(lib, "scap_version"):
+        lib.scap_version.restype = ctypes.c_char_p
+
+    buf = ctypes.POINTER(ctypes.c_ubyte)
+    for name in _OPS:
+        if hasattr(lib, name):
+            fn = getattr(lib, name)
+            fn.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p, ctypes.c_size_t, buf, ctypes.c_size_t]
+            fn.restype = ctypes.c_ssize_t
+    if hasattr(lib, _VERIFY):
+        fn = getattr(lib, _VERIFY)
+        fn.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p, ctypes.c_size_t]
+        fn.restype = ctypes.c_int
+
+
+def load():
+    """Return the libscap_ffi handle, loading it only once per library path."""
+    lib_path = _lib_path()
+    lib = _LIBS.get(lib_path)
+    if lib is not None:
+        return lib
+    with _LOCK:
+        lib = _LIBS.get(lib_path)
+        if lib is None:
+            lib = ctypes.CDLL(lib_path)
+            _bind_signatures(lib)
+            _LIBS[lib_path] = lib
     return lib
 
+
 def version() -> str:
     lib = load()
     return lib.scap_version().decode("utf-8")
+
+
+class ScapOps:
+    """Direct calls into the SCAP operations exported by libscap_ffi."""
+
+    def __init__(self, lib) -> None:
+        self._issue_token = lib.scap_issue_token
+        self._make_request = lib.scap_make_request
+        self._make_receipt = lib.scap_make_receipt
+        self._verify_receipt = getattr(lib, _VERIFY)
+
+    def _call(self, fn, a: bytes, b: bytes) -> bytes:
+        # A fresh buffer per call keeps concurrent callers from sharing output.
+        out = (ctypes.c_ubyte * _OUT_CAP)()
+        n = fn(a, len(a), b, len(b), out, _OUT_CAP)
+        if n < 0:
+            raise RuntimeError(f"{fn.__name__} failed with code {n}")
+        if n > _OUT_CAP:
+            raise RuntimeError(f"{fn.__name__} returned {n} bytes, more than the {_OUT_CAP}-byte buffer")
+        return ctypes.string_at(out, n)
+
+    def issue_token(self, subject: bytes, constraints: bytes) -> bytes:
+        return self._call(self._issue_token, subject, constraints)
+
+    def make_request(self, token: bytes, binding: bytes) -> bytes:
+        return self._call(self._make_request, token, binding)
+
+    def make_receipt(self, req: bytes, result_bytes: bytes) -> bytes:
+        return self._call(self._make_receipt, req, result_bytes)
+
+    def verify_receipt(self, receipt: bytes, req: bytes) -> bool:
+        return self._verify_receipt(receipt, len(receipt), req, len(req)) == 0
+
+
+def load_ops() -> Optional[ScapOps]:
+    """Return bound SCAP operations, or None if the library or its exports are missing."""
+    try:
+        lib = load()
+    except OSError:
+        return None
+    if not all(hasattr(lib, name) for name in (*_OPS, _VERIFY)):
+        return None
+    return ScapOps(lib)
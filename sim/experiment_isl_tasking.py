@@ -3,20 +3,45 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
+import heapq
+import hmac
 import json
 import random
+import struct
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Tuple, Union
 
 from sim.hypatia_stub import HypatiaStub
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:
+
+    def _dumps(payload: dict) -> bytes:
+        # Same bytes as orjson, so logs do not depend on which encoder is installed.
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
 
 SECONDS_PER_STEP = 600  # 10 minutes
 
+# Capability token body: task_id, valid_from, valid_to, max_hops, radius,
+# target_x, target_y, service id; followed by a 32-byte HMAC-SHA256 tag.
+TOKEN_FMT = struct.Struct("<QqqIdddI")
+TOKEN_SIG_LEN = 32
+
+
+@functools.lru_cache(maxsize=None)
+def _service_id(service: str) -> int:
+    return int.from_bytes(hashlib.blake2b(service.encode(), digest_size=4).digest(), "little")
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Task:
     task_id: int
     created_step: int
@@ -28,64 +53,75 @@ class Task:
 class TokenProvider:
     def __init__(self, secret: bytes) -> None:
         self.secret = secret
+        # SHA-256 state with the secret prefix already absorbed; copied per signature.
+        self._prefix_ctx = hashlib.sha256(secret)
+        # Every holder of a task validates the same token each step, so the tag
+        # check is done once per distinct token.
+        self._verified: Dict[bytes, Union[tuple, str]] = {}
+
+    def _sign(self, raw: bytes) -> str:
+        h = self._prefix_ctx.copy()
+        h.update(raw)
+        return h.hexdigest()
 
     def issue(self, task: Task, max_hops: int, radius: float) -> bytes:
-        payload = {
-            "task_id": task.task_id,
-            "valid_from": task.created_step,
-            "valid_to": task.deadline_step,
-            "max_hops": max_hops,
-            "radius": radius,
-            "target": task.target,
-            "allowed_services": [task.service],
-        }
-        raw = json.dumps(payload, sort_keys=True).encode()
-        signature = hashlib.sha256(self.secret + raw).hexdigest()
-        payload["sig"] = signature
-        return json.dumps(payload, sort_keys=True).encode()
+        raw = TOKEN_FMT.pack(
+            task.task_id,
+            task.created_step,
+            task.deadline_step,
+            max_hops,
+            radius,
+            task.target[0],
+            task.target[1],
+            _service_id(task.service),
+        )
+        return raw + hmac.digest(self.secret, raw, "sha256")
 
     def validate(self, token_bytes: bytes, task: Task, hop_count: int, now_step: int) -> Tuple[bool, str]:
-        try:
-            payload = json.loads(token_bytes.decode())
-        except Exception:
-            return False, "decode_failed"
-
-        sig = payload.pop("sig", None)
-        raw = json.dumps(payload, sort_keys=True).encode()
-        expected = hashlib.sha256(self.secret + raw).hexdigest()
-        if sig != expected:
-            return False, "bad_signature"
-
-        if not (payload["valid_from"] <= now_step <= payload["valid_to"]):
+        fields = self._verified.get(token_bytes)
+        if fields is None:
+            fields = self._verified[token_bytes] = self._check_token(token_bytes)
+        if isinstance(fields, str):
+            return False, fields
+
+        _task_id, valid_from, valid_to, max_hops, _radius, _tx, _ty, service_id = fields
+        if not (valid_from <= now_step <= valid_to):
             return False, "expired"
-        if hop_count > payload["max_hops"]:
+        if hop_count > max_hops:
             return False, "hop_limit"
-        if task.service not in payload.get("allowed_services", []):
+        if service_id != _service_id(task.service):
             return False, "service_not_allowed"
 
-        target = payload.get("target")
-        radius = payload.get("radius")
-        if target is None or radius is None:
-            return False, "missing_target"
-
         return True, "ok"
 
-    def receipt(self, task: Task, sat_id: bytes, now_step: int) -> bytes:
+    def _check_token(self, token_bytes: bytes) -> Union[tuple, str]:
+        """Verify a token's tag once; returns its unpacked fields or a rejection reason."""
+        if len(token_bytes) != TOKEN_FMT.size + TOKEN_SIG_LEN:
+            return "decode_failed"
+
+        raw = token_bytes[: TOKEN_FMT.size]
+        expected = hmac.digest(self.secret, raw, "sha256")
+        if not hmac.compare_digest(token_bytes[TOKEN_FMT.size :], expected):
+            return "bad_signature"
+        return TOKEN_FMT.unpack(raw)
+
+    def receipt(self, task: Task, sat_id: str, now_step: int) -> bytes:
         payload = {
             "task_id": task.task_id,
-            "sat": sat_id.decode(),
+            "sat": sat_id,
             "completed_step": now_step,
         }
         raw = json.dumps(payload, sort_keys=True).encode()
-        signature = hashlib.sha256(self.secret + raw).hexdigest()
+        signature = self._sign(raw)
         payload["sig"] = signature
         return json.dumps(payload, sort_keys=True).encode()
 
 
-def _write_event(handle, ts_step: int, event: str, **fields) -> None:
+def _write_event(buf: bytearray, ts_step: int, event: str, **fields) -> None:
     payload = {"t": ts_step, "event": event}
     payload.update(fields)
-    handle.write(json.dumps(payload) + "\n")
+    buf += _dumps(payload)
+    buf += b"\n"
 
 
 def _task_stream(seed: int, total_steps: int, ttl_steps: int) -> List[Task]:
@@ -104,10 +140,6 @@ def _task_stream(seed: int, total_steps: int, ttl_steps: int) -> List[Task]:
     return tasks
 
 
-def _distance(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
-
-
 def run_mode(
     mode: str,
     *,
@@ -137,17 +169,28 @@ def run_mode(
     )
     tasks = _task_stream(seed, total_steps, ttl_steps)
     pending: Dict[int, Task] = {}
+    # Ground mode only: pending ids in creation (= id) order; resolved entries are skipped lazily.
+    pending_order: Deque[int] = deque()
+    # (deadline_step, task_id) for every created task, so expiry pops instead of scanning.
+    deadline_heap: List[Tuple[int, int]] = []
     dispatched: Dict[int, int] = {}
-    in_flight: Dict[int, Dict[bytes, int]] = {}
+    in_flight: Dict[int, Dict[str, int]] = {}
     accepted: Dict[int, int] = {}
     tokens: Dict[int, bytes] = {}
+    # Area checks compare squared distances against the squared radius.
+    radius_sq = radius * radius
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as handle:
+    with output_path.open("wb") as handle:
         for step in range(total_steps):
+            # Events are buffered per step and written with a single call.
+            buf = bytearray()
             task = tasks[step]
-            _write_event(handle, step, "task_created", task_id=task.task_id)
+            _write_event(buf, step, "task_created", task_id=task.task_id)
             pending[task.task_id] = task
+            if mode == "ground":
+                pending_order.append(task.task_id)
+            heapq.heappush(deadline_heap, (task.deadline_step, task.task_id))
             if mode == "isl":
                 token = token_provider.issue(task, max_hops=max_hops, radius=radius)
                 if attack_p > 0 and rng.random() < attack_p:
@@ -157,7 +200,7 @@ def run_mode(
                         token_bytes[idx] ^= 0x01
                         token = bytes(token_bytes)
                 tokens[task.task_id] = token
-                _write_event(handle, step, "token_issued", task_id=task.task_id)
+                _write_event(buf, step, "token_issued", task_id=task.task_id)
 
             edges = hypatia.get_active_links()
             if outage_p > 0 or congestion_p > 0:
@@ -169,30 +212,36 @@ def run_mode(
                         continue
                     filtered.append(edge)
                 edges = filtered
-            edges = [(a.encode(), b.encode()) for a, b in edges]
-            ground_contacts = [edge for edge in edges if b"ground" in edge[0] or b"ground" in edge[1]]
+            # Node IDs stay as the stub's str names throughout: holders, positions
+            # and events all key on the same objects, with no encode/decode per use.
+            ground_contacts = [edge for edge in edges if "ground" in edge[0] or "ground" in edge[1]]
             sat_positions = hypatia.get_node_positions()
             ground_available = step % 6 == 0 and bool(ground_contacts)
 
             # Ground-gated dispatch
             if mode == "ground" and ground_available:
                 edge = ground_contacts[0]
-                sat = edge[0] if edge[0].startswith(b"sat-") else edge[1]
-                pending_ids = sorted(pending.keys())
-                if pending_ids:
-                    task_id = pending_ids[0]
+                sat = edge[0] if edge[0].startswith("sat-") else edge[1]
+                while pending_order and pending_order[0] not in pending:
+                    pending_order.popleft()
+                if pending_order:
+                    task_id = pending_order[0]
                     tsk = pending[task_id]
                     dispatched.setdefault(task_id, step)
-                    _write_event(handle, step, "task_dispatched", task_id=task_id, sat=sat.decode())
-                    _write_event(handle, step, "task_received", task_id=task_id, sat=sat.decode())
-                    sat_pos = sat_positions.get(sat.decode())
-                    within = sat_pos is not None and _distance(tsk.target, sat_pos) <= radius
+                    _write_event(buf, step, "task_dispatched", task_id=task_id, sat=sat)
+                    _write_event(buf, step, "task_received", task_id=task_id, sat=sat)
+                    sat_pos = sat_positions.get(sat)
+                    within = False
+                    if sat_pos is not None:
+                        dx = tsk.target[0] - sat_pos[0]
+                        dy = tsk.target[1] - sat_pos[1]
+                        within = dx * dx + dy * dy <= radius_sq
                     if within:
                         accepted[task_id] = step
-                        _write_event(handle, step, "task_accepted", task_id=task_id, sat=sat.decode())
-                        _write_event(handle, step, "task_completed", task_id=task_id, sat=sat.decode())
+                        _write_event(buf, step, "task_accepted", task_id=task_id, sat=sat)
+                        _write_event(buf, step, "task_completed", task_id=task_id, sat=sat)
                         _write_event(
-                            handle,
+                            buf,
                             step,
                             "receipt_emitted",
                             task_id=task_id,
@@ -204,40 +253,41 @@ def run_mode(
             if mode == "isl":
                 if ground_available:
                     edge = ground_contacts[0]
-                    sat = edge[0] if edge[0].startswith(b"sat-") else edge[1]
+                    sat = edge[0] if edge[0].startswith("sat-") else edge[1]
                     for task_id, tsk in list(pending.items()):
                         if task_id not in dispatched:
                             dispatched[task_id] = step
                             in_flight.setdefault(task_id, {})[sat] = 1
-                            _write_event(handle, step, "task_dispatched", task_id=task_id, sat=sat.decode())
-
-                # Propagate over ISLs
-                for task_id, holders in list(in_flight.items()):
-                    new_holders = dict(holders)
-                    for a, b in edges:
-                        if b"ground" in a or b"ground" in b:
-                            continue
-                        if a in holders and holders[a] < max_hops:
-                            new_holders.setdefault(b, holders[a] + 1)
-                            _write_event(
-                                handle,
-                                step,
-                                "task_forwarded",
-                                task_id=task_id,
-                                src=a.decode(),
-                                dst=b.decode(),
-                            )
-                        if b in holders and holders[b] < max_hops:
-                            new_holders.setdefault(a, holders[b] + 1)
-                            _write_event(
-                                handle,
-                                step,
-                                "task_forwarded",
-                                task_id=task_id,
-                                src=b.decode(),
-                                dst=a.decode(),
-                            )
-                    in_flight[task_id] = new_holders
+                            _write_event(buf, step, "task_dispatched", task_id=task_id, sat=sat)
+
+                # Propagate over ISLs: each holder forwards one hop per step.
+                # Adjacency is built once per step; the sort key is the edge's
+                # position (and direction) in `edges` so events keep their order.
+                sat_links: Dict[str, List[Tuple[int, str]]] = {}
+                for idx, (a, b) in enumerate(edges):
+                    if "ground" in a or "ground" in b:
+                        continue
+                    sat_links.setdefault(a, []).append((2 * idx, b))
+                    sat_links.setdefault(b, []).append((2 * idx + 1, a))
+
+                for task_id, holders in in_flight.items():
+                    forwards = [
+                        (order, src, dst, hops + 1)
+                        for src, hops in holders.items()
+                        if hops < max_hops
+                        for order, dst in sat_links.get(src, ())
+                    ]
+                    forwards.sort()
+                    for _order, src, dst, hops in forwards:
+                        holders.setdefault(dst, hops)
+                        _write_event(
+                            buf,
+                            step,
+                            "task_forwarded",
+                            task_id=task_id,
+                            src=src,
+                            dst=dst,
+                        )
 
                 # Validate/accept
                 for task_id, holders in list(in_flight.items()):
@@ -245,30 +295,33 @@ def run_mode(
                     token = tokens.get(task_id)
                     if token is None:
                         continue
+                    tx, ty = tsk.target
                     for sat, hop_count in list(holders.items()):
-                        sat_pos = sat_positions.get(sat.decode())
+                        sat_pos = sat_positions.get(sat)
                         if sat_pos is None:
                             continue
-                        within = _distance(tsk.target, sat_pos) <= radius
+                        dx = tx - sat_pos[0]
+                        dy = ty - sat_pos[1]
+                        within = dx * dx + dy * dy <= radius_sq
                         ok, reason = token_provider.validate(token, tsk, hop_count, step)
                         if not within:
                             ok, reason = False, "outside_area"
                         _write_event(
-                            handle,
+                            buf,
                             step,
                             "token_validated",
                             task_id=task_id,
-                            sat=sat.decode(),
+                            sat=sat,
                             ok=ok,
                             reason=reason,
                         )
                         if ok:
                             accepted[task_id] = step
-                            _write_event(handle, step, "task_received", task_id=task_id, sat=sat.decode())
-                            _write_event(handle, step, "task_accepted", task_id=task_id, sat=sat.decode())
-                            _write_event(handle, step, "task_completed", task_id=task_id, sat=sat.decode())
+                            _write_event(buf, step, "task_received", task_id=task_id, sat=sat)
+                            _write_event(buf, step, "task_accepted", task_id=task_id, sat=sat)
+                            _write_event(buf, step, "task_completed", task_id=task_id, sat=sat)
                             _write_event(
-                                handle,
+                                buf,
                                 step,
                                 "receipt_emitted",
                                 task_id=task_id,
@@ -281,11 +334,12 @@ def run_mode(
                         continue
 
             # Deadline accounting
-            for t_id, tsk in list(pending.items()):
-                if step > tsk.deadline_step:
-                    _write_event(handle, step, "deadline_miss", task_id=t_id)
-                    pending.pop(t_id, None)
+            while deadline_heap and deadline_heap[0][0] < step:
+                _deadline, t_id = heapq.heappop(deadline_heap)
+                if pending.pop(t_id, None) is not None:
+                    _write_event(buf, step, "deadline_miss", task_id=t_id)
 
+            handle.write(buf)
             hypatia.step(1)
 
 
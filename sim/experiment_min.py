@@ -1,28 +1,43 @@
 ﻿import random
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 from adapters.scrap_backend import get_backend
 
 def tamper(b: bytes) -> bytes:
     if not b:
         return b
-    i = random.randrange(len(b))
-    flipped = (b[i] ^ 0x01).to_bytes(1, "little")
-    return b[:i] + flipped + b[i+1:]
+    buf = bytearray(b)
+    buf[random.randrange(len(buf))] ^= 0x01
+    return bytes(buf)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Graph:
+    # Immutable: make_random_graph hands the same cached graph to every trial.
     n: int
-    edges: set  # set of (u,v) with u < v
-    adj: dict   # u -> set(v)
+    edges: frozenset  # frozenset of (u,v) with u < v
+    adj: Mapping[int, tuple]  # read-only u -> tuple(v)
+    bfs_prev: dict = field(default_factory=dict, repr=False, compare=False)  # src -> BFS predecessor map
 
 def make_random_graph(n: int, p: float, seed: int = 1) -> Graph:
+    # Seeds the global RNG like before and leaves it in the same state, but the
+    # O(n^2) edge draws only run once per (n, p, seed) across the trial grid.
+    g, state = _random_graph(n, p, seed)
+    random.setstate(state)
+    return g
+
+@lru_cache(maxsize=None)
+def _random_graph(n: int, p: float, seed: int):
     random.seed(seed)
+    rand = random.random
     edges = set()
     adj = {i: set() for i in range(n)}
     for u in range(n):
         for v in range(u + 1, n):
-            if random.random() < p:
+            if rand() < p:
                 edges.add((u, v))
                 adj[u].add(v)
                 adj[v].add(u)
@@ -32,19 +47,29 @@ def make_random_graph(n: int, p: float, seed: int = 1) -> Graph:
             edges.add((i, i + 1))
             adj[i].add(i + 1)
             adj[i + 1].add(i)
-    return Graph(n=n, edges=edges, adj=adj)
+    # Tuples keep each neighbour set's iteration order, so BFS tie-breaks are unchanged.
+    frozen_adj = MappingProxyType({u: tuple(vs) for u, vs in adj.items()})
+    return Graph(n=n, edges=frozenset(edges), adj=frozen_adj), random.getstate()
+
+def _bfs_prev(g: Graph, src: int) -> dict:
+    # full BFS tree from src; the graph never changes, so it is built once per source
+    prev = g.bfs_prev.get(src)
+    if prev is None:
+        q = deque([src])
+        prev = {src: None}
+        adj = g.adj
+        while q:
+            u = q.popleft()
+            for v in adj[u]:
+                if v not in prev:
+                    prev[v] = u
+                    q.append(v)
+        g.bfs_prev[src] = prev
+    return prev
 
 def bfs_path(g: Graph, src: int, dst: int):
     # shortest path (one of them)
-    q = [src]
-    prev = {src: None}
-    for u in q:
-        if u == dst:
-            break
-        for v in g.adj[u]:
-            if v not in prev:
-                prev[v] = u
-                q.append(v)
+    prev = _bfs_prev(g, src)
     if dst not in prev:
         return None
     path = []
@@ -105,11 +130,20 @@ def run_trial(mode: str, disruption: float, load: str, n_jobs: int = 200, seed:
     total_ctrl_bytes = 0
     unroutable = 0
 
+    # loop invariants; draws stay on the global RNG in the same order as before
+    rand = random.random
+    randrange = random.randrange
+    issue_token = scrap.issue_capability_token
+    make_request = scrap.make_bound_task_request
+    make_receipt = scrap.make_receipt
+    payment_hash = b"\x11" * 32
+    ctrl_base = int(base_ctrl * load_ctrl)
+
     for i in range(n_jobs):
-        src = random.randrange(N)
-        dst = random.randrange(N)
+        src = randrange(N)
+        dst = randrange(N)
         while dst == src:
-            dst = random.randrange(N)
+            dst = randrange(N)
 
         path = bfs_path(g, src, dst)
         if not path:
@@ -128,21 +162,11 @@ def run_trial(mode: str, disruption: float, load: str, n_jobs: int = 200, seed:
             # opaque: reveal nothing route-related
             pass
 
-        # pretend SCRAP protocol flow
-        token = scrap.issue_capability_token(
-            subject=f"sat-{src}",
-            caps=["svc:downlink"],
-            constraints={"mode": mode},
-        )
-        req = scrap.make_bound_task_request(
-            token=token,
-            payment_hash=b"\x11" * 32,
-            task_params={"job": i, "load": load, "mode": mode},
-        )
+        # the backend never touches the global RNG, so drawing the failure
+        # first keeps the stream unchanged and lets failed jobs skip SCRAP calls
+        failed = rand() < base_fail
 
-        failed = random.random() < base_fail
-
-        ctrl_bytes = int(base_ctrl * load_ctrl)
+        ctrl_bytes = ctrl_base
         if mode == "revealed":
             ctrl_bytes += 250 + 15 * (len(path) - 1)  # route disclosure scales w hops
         elif mode == "abstracted":
@@ -154,14 +178,26 @@ def run_trial(mode: str, disruption: float, load: str, n_jobs: int = 200, seed:
         if not failed:
             successes += 1
 
-            receipt = scrap.make_receipt(req, b"result")
-            if random.random() < attack_p:
+            # pretend SCRAP protocol flow
+            token = issue_token(
+                subject=f"sat-{src}",
+                caps=["svc:downlink"],
+                constraints={"mode": mode},
+            )
+            req = make_request(
+                token=token,
+                payment_hash=payment_hash,
+                task_params={"job": i, "load": load, "mode": mode},
+            )
+
+            # receipts are deterministic in (req, result), so the genuine one
+            # doubles as the expected value for the strict byte compare
+            expected = make_receipt(req, b"result")
+            if rand() < attack_p:
                 # adversary flips one bit in transit
-                receipt = tamper(receipt)
-
-            # strict verify: recompute expected receipt and compare bytes
-            expected = scrap.make_receipt(req, b"result")
-            if receipt == expected:
+                if tamper(expected) == expected:
+                    verify_ok += 1
+            else:
                 verify_ok += 1
 
     ran = n_jobs - unroutable
@@ -10,12 +10,21 @@ import random
 import shlex
 import shutil
 import subprocess
+from collections import deque
 from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from scrap_hypatia.adapter import HypatiaPacket
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 
 NodeId = bytes
 Edge = Tuple[NodeId, NodeId]
@@ -146,7 +155,7 @@ def _normalize_nodes(payload: Dict[str, Any], keys: Iterable[str]) -> List[bytes
 
 
 def load_schedule(path: Path) -> Dict[str, Any]:
-    payload = json.loads(path.read_text(encoding="utf-8"))
+    payload = _loads(path.read_bytes())
     steps = _normalize_steps(payload)
     sat_nodes = _normalize_nodes(
         payload,
@@ -169,13 +178,20 @@ def load_schedule(path: Path) -> Dict[str, Any]:
 
 
 def _infer_nodes_from_steps(steps: Iterable[dict]) -> Tuple[List[bytes], List[bytes]]:
+    # One C-level set update per step; only the distinct nodes are classified and sorted.
     nodes = set()
+    update = nodes.update
     for step in steps:
-        for a, b in step.get("edges", []):
-            nodes.add(a)
-            nodes.add(b)
-    sat_nodes = sorted([n for n in nodes if str(n).startswith("sat-")])
-    ground_nodes = sorted([n for n in nodes if str(n).startswith("ground")])
+        update(chain.from_iterable(step.get("edges", ())))
+    sat_nodes: List[str] = []
+    ground_nodes: List[str] = []
+    for node in map(str, nodes):
+        if node.startswith("sat-"):
+            sat_nodes.append(node)
+        elif node.startswith("ground"):
+            ground_nodes.append(node)
+    sat_nodes.sort()
+    ground_nodes.sort()
     return [n.encode() for n in sat_nodes], [n.encode() for n in ground_nodes]
 
 
@@ -198,6 +214,18 @@ class HypatiaScheduleSim:
         self.outage_p = float(self.outage_p)
         self.congestion_p = float(self.congestion_p)
         self.rng = self.rng or random.Random()
+        # Schedule edges are encoded once up front; the adjacency is cached for
+        # the schedule slot currently in use.
+        self._edges_s: List[List[Tuple[str, str]]] = [
+            [(a, b) for a, b in step.get("edges", [])] for step in self.steps
+        ]
+        self._edges_b: List[List[Edge]] = [
+            [(a.encode(), b.encode()) for a, b in edges] for edges in self._edges_s
+        ]
+        self._adj_idx = -1
+        self._adj: Dict[NodeId, List[NodeId]] = {}
+        self._positions_key: Optional[Tuple[Tuple[bytes, ...], Tuple[bytes, ...]]] = None
+        self._positions: Dict[str, Tuple[float, float]] = {}
 
     @property
     def now(self) -> int:
@@ -218,43 +246,54 @@ class HypatiaScheduleSim:
             self._process_queue()
 
     def get_node_positions(self) -> Dict[str, Tuple[float, float]]:
-        positions: Dict[str, Tuple[float, float]] = {}
-        total = max(1, len(self.sat_nodes))
-        for idx, node in enumerate(self.sat_nodes):
-            angle = 2 * 3.14159 * (idx / total)
-            radius = 0.9 + 0.02 * idx
-            positions[node.decode()] = (radius * math.cos(angle), radius * math.sin(angle))
-        for idx, node in enumerate(self.ground_nodes):
-            positions[node.decode()] = (0.0, -1.2 - 0.05 * idx)
-        return positions
+        # Layout is time-invariant; recompute only if the node lists are replaced
+        # (e.g. ground nodes overridden after construction).
+        key = (tuple(self.sat_nodes), tuple(self.ground_nodes))
+        if key != self._positions_key:
+            positions: Dict[str, Tuple[float, float]] = {}
+            total = max(1, len(self.sat_nodes))
+            for idx, node in enumerate(self.sat_nodes):
+                angle = 2 * 3.14159 * (idx / total)
+                radius = 0.9 + 0.02 * idx
+                positions[node.decode()] = (radius * math.cos(angle), radius * math.sin(angle))
+            for idx, node in enumerate(self.ground_nodes):
+                positions[node.decode()] = (0.0, -1.2 - 0.05 * idx)
+            self._positions = positions
+            self._positions_key = key
+        return dict(self._positions)
 
     def get_active_links(self) -> List[Tuple[str, str]]:
-        edges = self._edges_at_time(self._t)
-        return [(a.decode(), b.decode()) for a, b in edges]
+        return list(self._edges_s[self._slot(self._t)])
 
     def can_send(self, src: NodeId, dst: NodeId, _meta: Optional[dict] = None) -> bool:
-        edges = self._edges_at_time(self._t)
-        return self._has_path(src, dst, edges)
-
-    def _edges_at_time(self, t: int) -> List[Edge]:
-        idx = min(t, len(self.steps) - 1)
-        step = self.steps[idx]
-        edges: List[Edge] = []
-        for a, b in step.get("edges", []):
-            edges.append((a.encode(), b.encode()))
-        return edges
+        return self._has_path(src, dst, self._adjacency_at_time(self._t))
 
-    def _has_path(self, src: NodeId, dst: NodeId, edges: List[Edge]) -> bool:
-        if src == dst:
-            return True
+    def _slot(self, t: int) -> int:
+        return min(t, len(self.steps) - 1)
+
+    def _adjacency_at_time(self, t: int) -> Dict[NodeId, List[NodeId]]:
+        idx = self._slot(t)
+        if idx != self._adj_idx:
+            self._adj = self._adjacency(self._edges_b[idx])
+            self._adj_idx = idx
+        return self._adj
+
+    @staticmethod
+    def _adjacency(edges: List[Edge]) -> Dict[NodeId, List[NodeId]]:
         nbrs: Dict[NodeId, List[NodeId]] = {}
         for a, b in edges:
             nbrs.setdefault(a, []).append(b)
             nbrs.setdefault(b, []).append(a)
-        q = [src]
+        return nbrs
+
+    def _has_path(self, src: NodeId, dst: NodeId, nbrs: Dict[NodeId, List[NodeId]]) -> bool:
+        if src == dst:
+            return True
+        q = deque([src])
         seen = {src}
-        for u in q:
-            for v in nbrs.get(u, []):
+        while q:
+            u = q.popleft()
+            for v in nbrs.get(u, ()):
                 if v == dst:
                     return True
                 if v not in seen:
@@ -265,14 +304,15 @@ class HypatiaScheduleSim:
     def _process_queue(self) -> None:
         if not self._queue:
             return
-        edges = self._edges_at_time(self._t)
+        # One adjacency per tick, shared by every queued packet's path check.
+        nbrs = self._adjacency_at_time(self._t)
         keep: List[Tuple[int, HypatiaPacket]] = []
         for t_inject, pkt in self._queue:
             if (self._t - t_inject) > int(pkt.meta.get("ttl_steps", self.ttl_steps)):
                 for cb in self._on_drop:
                     cb(pkt, "ttl")
                 continue
-            if not self._has_path(pkt.src, pkt.dst, edges):
+            if not self._has_path(pkt.src, pkt.dst, nbrs):
                 keep.append((t_inject, pkt))
                 continue
             if self.outage_p > 0.0 and self.rng.random() < self.outage_p:
@@ -32,18 +32,127 @@ Model sketch:
 
 from __future__ import annotations
 
+import functools
 import math
 import random
 from collections import deque
 from dataclasses import dataclass
-from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Literal, Optional, Tuple
 
 from scrap_hypatia.adapter import HypatiaPacket
 from sim.leo_data import SatelliteRecord, sample_synthetic_leo
 
 
 NodeId = bytes
-Edge = Tuple[NodeId, NodeId]
+
+
+class _Topology:
+    """Link schedule of one stub configuration, with its own bounded edge caches.
+
+    Node indices are satellites first, then ground station g at n_sats + g.
+    """
+
+    def __init__(
+        self,
+        n_sats: int,
+        n_ground: int,
+        ring_period: int,
+        duty_on: int,
+        crosslink_window: int,
+        crosslink_period: int,
+        constellation_crosslinks: int,
+        constellations: Tuple[Tuple[int, ...], ...],
+    ) -> None:
+        self.n_sats = n_sats
+        self.n_ground = n_ground
+        self.ring_period = ring_period
+        self.duty_on = duty_on
+        self.crosslink_window = crosslink_window
+        self.crosslink_period = crosslink_period
+        self.constellation_crosslinks = constellation_crosslinks
+        self.constellations = constellations
+        self.edge_indices = functools.lru_cache(maxsize=4096)(self._edge_indices)
+        self.component_labels = functools.lru_cache(maxsize=4096)(self._component_labels)
+        self._ring_edges = functools.lru_cache(maxsize=1024)(self._ring_edges)
+        self._window_edges = functools.lru_cache(maxsize=1024)(self._window_edges)
+        self._constellation_edges = functools.lru_cache(maxsize=1024)(self._constellation_edges)
+
+    def _edge_indices(self, t: int) -> Tuple[Tuple[int, int], ...]:
+        """Active edges at timestep t as node-index pairs.
+
+        The duty-cycled ring and constellation links repeat every ring_period ticks and
+        the ground/crosslink window only moves every crosslink_period ticks, so each
+        part is cached on its own phase and a tick just concatenates them.
+        """
+        phase = t % self.ring_period
+        start = (t // self.crosslink_period) % self.n_sats
+        return self._ring_edges(phase) + self._window_edges(start) + self._constellation_edges(phase)
+
+    def _component_labels(self, t: int) -> Tuple[int, ...]:
+        """Union-find over the tick's edges; returns each node index's root."""
+        parent = list(range(self.n_sats + self.n_ground))
+
+        def find(x: int) -> int:
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        for a, b in self.edge_indices(t):
+            ra = find(a)
+            rb = find(b)
+            if ra != rb:
+                parent[rb] = ra
+        return tuple(find(x) for x in range(len(parent)))
+
+    def _ring_edges(self, phase: int) -> Tuple[Tuple[int, int], ...]:
+        n_sats, ring_period, duty_on = self.n_sats, self.ring_period, self.duty_on
+        # Intermittent ring connectivity among sats (simple contact windows)
+        return tuple((i, (i + 1) % n_sats) for i in range(n_sats) if (phase + i) % ring_period < duty_on)
+
+    def _window_edges(self, start: int) -> Tuple[Tuple[int, int], ...]:
+        n_sats, n_ground, crosslink_window = self.n_sats, self.n_ground, self.crosslink_window
+        edges: List[Tuple[int, int]] = []
+
+        # Ground stations have contact windows with subsets of sats
+        ground_offset = max(1, n_sats // max(1, n_ground))
+        for g_idx in range(n_ground):
+            g_start = (start + g_idx * ground_offset) % n_sats
+            for k in range(crosslink_window):
+                edges.append(((g_start + k) % n_sats, n_sats + g_idx))
+
+        # Add rotating crosslinks (a simple proxy for changing geometry)
+        # Connect sats i -> i+W for a window.
+        w = max(2, crosslink_window)
+        for k in range(crosslink_window):
+            i = (start + k) % n_sats
+            edges.append((i, (i + w) % n_sats))
+        return tuple(edges)
+
+    def _constellation_edges(self, phase: int) -> Tuple[Tuple[int, int], ...]:
+        ring_period, duty_on = self.ring_period, self.duty_on
+        edges: List[Tuple[int, int]] = []
+
+        # Extra intra-constellation links to mimic operator-owned crosslinks
+        if self.constellation_crosslinks > 0:
+            for members in self.constellations:
+                if len(members) < 2:
+                    continue
+                for extra in range(self.constellation_crosslinks):
+                    offset = extra + 1
+                    for idx in range(len(members)):
+                        a_idx = members[idx]
+                        if (phase + a_idx + extra) % ring_period < duty_on:
+                            edges.append((a_idx, members[(idx + offset) % len(members)]))
+        return tuple(edges)
+
+
+@functools.lru_cache(maxsize=8)
+def _topology(params: tuple) -> _Topology:
+    """Shared _Topology for recently used parameters, so sweep scenarios reuse its caches."""
+    return _Topology(*params)
 
 
 @dataclass
@@ -102,14 +211,56 @@ class HypatiaStub:
         self.sat_nodes: List[NodeId] = [f"sat-{i}".encode() for i in range(self.n_sats)]
         self.ground_nodes: List[NodeId] = [f"ground-{i}".encode() for i in range(self.n_ground)]
         self.nodes: List[NodeId] = self.sat_nodes + self.ground_nodes
+        self._node_index: Dict[NodeId, int] = {node: idx for idx, node in enumerate(self.nodes)}
+        self._node_names: List[str] = [node.decode() for node in self.nodes]
 
         self._constellations: Dict[str, List[int]] = {}
         for idx, sat in enumerate(self.satellites):
             self._constellations.setdefault(sat.constellation, []).append(idx)
 
+        # Link schedule, shared with recent stubs of the same topology (e.g. sweep scenarios).
+        self._topology = _topology(
+            (
+                self.n_sats,
+                self.n_ground,
+                max(1, self.ring_period),
+                int(self.ring_duty * max(1, self.ring_period)),
+                self.crosslink_window,
+                max(1, self.crosslink_period),
+                self.constellation_crosslinks,
+                tuple(tuple(members) for members in self._constellations.values()),
+            )
+        )
+
         self._min_alt_km = min(sat.altitude_km for sat in self.satellites)
         self._max_alt_km = max(sat.altitude_km for sat in self.satellites)
 
+        # Per-satellite layout constants as parallel lists, so positions only
+        # need the time-dependent trig per call.
+        alt_span = max(1e-3, self._max_alt_km - self._min_alt_km)
+        steps_per_day = max(1.0, 86400.0 / self.dt_s)
+        self._sat_base_theta: List[float] = []
+        self._sat_omega: List[float] = []
+        self._sat_radius: List[float] = []
+        self._sat_cos_incl: List[float] = []
+        for i, sat in enumerate(self.satellites):
+            mean_motion = max(0.01, sat.mean_motion_rev_per_day)
+            self._sat_base_theta.append(2 * math.pi * (i / self.n_sats))
+            self._sat_omega.append(mean_motion * 2 * math.pi / steps_per_day)
+            self._sat_radius.append(1.0 + 0.08 * (sat.altitude_km - self._min_alt_km) / alt_span)
+            self._sat_cos_incl.append(math.cos(math.radians(sat.inclination_deg)))
+        self._sat_positions_t = -1
+        self._sat_positions: Dict[str, Tuple[float, float]] = {}
+
+        # Ground stations around a lower ring
+        self._ground_positions: Dict[str, Tuple[float, float]] = {}
+        for i in range(self.n_ground):
+            theta = 2 * math.pi * (i / max(1, self.n_ground))
+            self._ground_positions[self._node_names[self.n_sats + i]] = (
+                1.05 * math.cos(theta),
+                -1.2 + 0.05 * math.sin(theta),
+            )
+
     # ---------- Event hooks ----------
     def on_delivery(self, cb: Callable[[HypatiaPacket], None]) -> None:
         self._on_delivery.append(cb)
@@ -130,35 +281,37 @@ class HypatiaStub:
             self._process_queue()
 
     # ---------- Visualization helpers ----------
-    def get_node_positions(self) -> Dict[str, Tuple[float, float]]:
-        """Return normalized (x,y) positions in [-1,1] for animation."""
-        positions: Dict[str, Tuple[float, float]] = {}
-
-        # Satellites on ring, using real mean motion when available
-        for i, sat in enumerate(self.satellites):
-            mean_motion = max(0.01, sat.mean_motion_rev_per_day)
-            omega = mean_motion * 2 * math.pi / max(1.0, 86400.0 / self.dt_s)
-            theta = 2 * math.pi * (i / self.n_sats) + omega * self._t
-            inclination = math.radians(sat.inclination_deg)
-
-            alt_span = max(1e-3, self._max_alt_km - self._min_alt_km)
-            radius = 1.0 + 0.08 * (sat.altitude_km - self._min_alt_km) / alt_span
-
-            positions[f"sat-{i}"] = (radius * math.cos(theta), radius * math.sin(theta) * math.cos(inclination))
-
-        # Ground stations around a lower ring
-        for i in range(self.n_ground):
-            theta = 2 * math.pi * (i / max(1, self.n_ground))
-            positions[f"ground-{i}"] = (1.05 * math.cos(theta), -1.2 + 0.05 * math.sin(theta))
+    def get_node_positions(self, which: Literal["all", "sats", "ground"] = "all") -> Dict[str, Tuple[float, float]]:
+        """Return normalized (x,y) positions in [-1,1] for animation.
+
+        ``which`` restricts the result to satellites or ground stations. Satellite
+        positions are computed once per timestep; ground stations never move.
+        """
+        if which == "ground":
+            return dict(self._ground_positions)
+
+        if self._sat_positions_t != self._t:
+            positions: Dict[str, Tuple[float, float]] = {}
+
+            # Satellites on ring, using real mean motion when available
+            t = self._t
+            for name, base_theta, omega, radius, cos_incl in zip(
+                self._node_names, self._sat_base_theta, self._sat_omega, self._sat_radius, self._sat_cos_incl
+            ):
+                theta = base_theta + omega * t
+                positions[name] = (radius * math.cos(theta), radius * math.sin(theta) * cos_incl)
+            self._sat_positions = positions
+            self._sat_positions_t = t
+
+        positions = dict(self._sat_positions)
+        if which == "all":
+            positions.update(self._ground_positions)
         return positions
 
     def get_active_links(self) -> List[Tuple[str, str]]:
         """Return active undirected links as pairs of node name strings."""
-        edges = self._active_edges()
-        out: List[Tuple[str, str]] = []
-        for a, b in edges:
-            out.append((a.decode(), b.decode()))
-        return out
+        names = self._node_names
+        return [(names[a], names[b]) for a, b in self._topology.edge_indices(self._t)]
 
     # ---------- Packet injection ----------
     def inject_packet(self, pkt: HypatiaPacket) -> None:
@@ -171,114 +324,72 @@ class HypatiaStub:
 
     # ---------- Internal network model ----------
     def can_send(self, src: NodeId, dst: NodeId, _meta: Optional[dict] = None) -> bool:
-        edges = self._active_edges()
-        return self._has_path(src, dst, edges)
-
-    def _active_edges(self) -> List[Edge]:
-        """Active edges at current timestep."""
-        edges: List[Edge] = []
+        return self._has_path(src, dst, self._components())
 
-        # Intermittent ring connectivity among sats (simple contact windows)
-        for i in range(self.n_sats):
-            # Duty-cycled edge availability
-            phase = (self._t + i) % max(1, self.ring_period)
-            if phase < int(self.ring_duty * max(1, self.ring_period)):
-                a = f"sat-{i}".encode()
-                b = f"sat-{(i + 1) % self.n_sats}".encode()
-                edges.append((a, b))
-
-        # Ground stations have contact windows with subsets of sats
-        start = (self._t // max(1, self.crosslink_period)) % self.n_sats
-        ground_offset = max(1, self.n_sats // max(1, self.n_ground))
-        for g_idx, ground in enumerate(self.ground_nodes):
-            g_start = (start + g_idx * ground_offset) % self.n_sats
-            for k in range(self.crosslink_window):
-                s = f"sat-{(g_start + k) % self.n_sats}".encode()
-                edges.append((s, ground))
-
-        # Add rotating crosslinks (a simple proxy for changing geometry)
-        # Connect sats i -> i+W for a window.
-        w = max(2, self.crosslink_window)
-        for k in range(self.crosslink_window):
-            i = (start + k) % self.n_sats
-            a = f"sat-{i}".encode()
-            b = f"sat-{(i + w) % self.n_sats}".encode()
-            edges.append((a, b))
-
-        # Extra intra-constellation links to mimic operator-owned crosslinks
-        if self.constellation_crosslinks > 0:
-            for members in self._constellations.values():
-                if len(members) < 2:
-                    continue
-                for extra in range(self.constellation_crosslinks):
-                    offset = extra + 1
-                    for idx in range(len(members)):
-                        a_idx = members[idx]
-                        b_idx = members[(idx + offset) % len(members)]
-                        phase = (self._t + a_idx + extra) % max(1, self.ring_period)
-                        if phase < int(self.ring_duty * max(1, self.ring_period)):
-                            a = f"sat-{a_idx}".encode()
-                            b = f"sat-{b_idx}".encode()
-                            edges.append((a, b))
+    def _components(self) -> Tuple[int, ...]:
+        """Connected-component label per node index for the current timestep.
 
-        return edges
+        Labels are computed once per tick (and shared between stubs with the same
+        topology); every reachability query in that tick is a label comparison.
+        """
+        return self._topology.component_labels(self._t)
 
-    def _has_path(self, src: NodeId, dst: NodeId, edges: List[Edge]) -> bool:
-        """BFS reachability on an undirected graph."""
+    def _has_path(self, src: NodeId, dst: NodeId, labels: Tuple[int, ...]) -> bool:
+        """Reachability on the undirected graph of the current timestep."""
         if src == dst:
             return True
 
-        nbrs: Dict[NodeId, List[NodeId]] = {}
-        for a, b in edges:
-            nbrs.setdefault(a, []).append(b)
-            nbrs.setdefault(b, []).append(a)
-
-        q = deque([src])
-        seen = {src}
-        while q:
-            u = q.popleft()
-            for v in nbrs.get(u, []):
-                if v == dst:
-                    return True
-                if v not in seen:
-                    seen.add(v)
-                    q.append(v)
-        return False
+        src_idx = self._node_index.get(src)
+        dst_idx = self._node_index.get(dst)
+        if src_idx is None or dst_idx is None:
+            return False
+        return labels[src_idx] == labels[dst_idx]
 
     def _process_queue(self) -> None:
         if not self._queue:
             return
 
-        edges = self._active_edges()
+        labels = self._components()
         keep: Deque[_Queued] = deque()
 
-        while self._queue:
-            qd = self._queue.popleft()
+        # Loop invariants, resolved once per tick
+        queue = self._queue
+        popleft = queue.popleft
+        t = self._t
+        has_path = self._has_path
+        rand = self.rng.random
+        outage_p = self.outage_p
+        congestion_p = self.congestion_p
+        on_drop = tuple(self._on_drop)
+        on_delivery = tuple(self._on_delivery)
+
+        while queue:
+            qd = popleft()
             pkt = qd.pkt
 
             # TTL expiry
-            if (self._t - qd.t_inject) > qd.ttl_steps:
-                for cb in self._on_drop:
+            if (t - qd.t_inject) > qd.ttl_steps:
+                for cb in on_drop:
                     cb(pkt, "ttl")
                 continue
 
             # No path right now: keep queued
-            if not self._has_path(pkt.src, pkt.dst, edges):
+            if not has_path(pkt.src, pkt.dst, labels):
                 keep.append(qd)
                 continue
 
             # Path exists: deliver unless dropped by outage/congestion
-            if self.rng.random() < self.outage_p:
-                for cb in self._on_drop:
+            if rand() < outage_p:
+                for cb in on_drop:
                     cb(pkt, "outage")
                 continue
 
-            if self.rng.random() < self.congestion_p:
-                for cb in self._on_drop:
+            if rand() < congestion_p:
+                for cb in on_drop:
                     cb(pkt, "congestion")
                 continue
 
-            for cb in self._on_delivery:
+            for cb in on_delivery:
                 cb(pkt)
 
         self._queue = keep
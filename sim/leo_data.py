@@ -5,15 +5,19 @@ Use TLE sources when available, but keep a synthetic fallback for offline runs.
 
 from __future__ import annotations
 
+import functools
 import hashlib
 import math
+import os
 import random
 import re
+import shutil
+import tempfile
 import time
 import urllib.request
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Tuple
 
 EARTH_RADIUS_KM = 6378.137
 MU_KM3_S2 = 398600.4418
@@ -34,11 +38,16 @@ class SatelliteRecord:
     altitude_km: float
 
 
+# No prefix is a prefix of another, so at most one alternative can match.
+_CONSTELLATION_PREFIX = re.compile("STARLINK|ONEWEB|IRIDIUM|GLOBALSTAR|ORBCOMM|SWARM|PLANET|SPIRE")
+
+
 def _constellation_from_name(name: str) -> str:
     upper = name.upper()
-    for prefix in ("STARLINK", "ONEWEB", "IRIDIUM", "GLOBALSTAR", "ORBCOMM", "SWARM", "PLANET", "SPIRE"):
-        if upper.startswith(prefix):
-            return prefix
+    match = _CONSTELLATION_PREFIX.match(upper)
+    if match is not None:
+        return match.group()
+    # Operator names that appear later in the object name
     if "STARLINK" in upper:
         return "STARLINK"
     if "ONEWEB" in upper:
@@ -64,32 +73,29 @@ def is_placeholder_source(source: str) -> bool:
 def parse_tle_lines(lines: Iterable[str]) -> List[SatelliteRecord]:
     clean = [line.strip("\n") for line in lines if line.strip()]
     records: List[SatelliteRecord] = []
-    for i in range(0, len(clean) - 2, 3):
-        name = clean[i].strip()
-        line1 = clean[i + 1]
-        line2 = clean[i + 2]
-        if not (line1.startswith("1") and line2.startswith("2")):
+    append = records.append
+    # Fixed-width columns, walked as aligned (name, line 1, line 2) triples.
+    for name, line1, line2 in zip(clean[0::3], clean[1::3], clean[2::3]):
+        if line1[:1] != "1" or line2[:1] != "2":
             continue
 
-        norad_id = line1[2:7].strip()
-        inclination_deg = float(line2[8:16])
+        name = name.strip()
         mean_motion = float(line2[52:63])
-        altitude_km = _mean_motion_to_altitude_km(mean_motion)
-        constellation = _constellation_from_name(name)
-        records.append(
+        append(
             SatelliteRecord(
-                name=name,
-                norad_id=norad_id,
-                constellation=constellation,
-                mean_motion_rev_per_day=mean_motion,
-                inclination_deg=inclination_deg,
-                altitude_km=altitude_km,
+                name,
+                line1[2:7].strip(),
+                _constellation_from_name(name),
+                mean_motion,
+                float(line2[8:16]),
+                _mean_motion_to_altitude_km(mean_motion),
             )
         )
     return records
 
 
-def _load_with_cache(url: str, cache_dir: Path, ttl_hours: float) -> List[str]:
+def _load_with_cache(url: str, cache_dir: Path, ttl_hours: float) -> Path:
+    """Return the on-disk copy of url, downloading it if missing or older than ttl_hours."""
     cache_dir.mkdir(parents=True, exist_ok=True)
     digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
     cache_path = cache_dir / f"tle_{digest}.txt"
@@ -98,12 +104,26 @@ def _load_with_cache(url: str, cache_dir: Path, ttl_hours: float) -> List[str]:
     if cache_path.exists():
         age_hours = (now - cache_path.stat().st_mtime) / 3600.0
         if age_hours <= ttl_hours:
-            return cache_path.read_text(encoding="utf-8", errors="ignore").splitlines()
+            return cache_path
+
+    # Stream the response straight to disk instead of holding it in memory. Each
+    # download gets its own partial file, which only replaces the cache once it has
+    # completed and is removed if it did not.
+    out = tempfile.NamedTemporaryFile(dir=cache_dir, prefix=f"{cache_path.stem}.", suffix=".part", delete=False)
+    try:
+        with out, urllib.request.urlopen(url, timeout=30) as resp:
+            shutil.copyfileobj(resp, out)
+        os.replace(out.name, cache_path)
+    finally:
+        Path(out.name).unlink(missing_ok=True)
+    return cache_path
+
 
-    with urllib.request.urlopen(url, timeout=30) as resp:
-        text = resp.read().decode("utf-8", errors="ignore")
-    cache_path.write_text(text, encoding="utf-8")
-    return text.splitlines()
+@functools.lru_cache(maxsize=8)
+def _parse_tle_file(path: str, mtime_ns: int, size: int) -> Tuple[SatelliteRecord, ...]:
+    # Keyed on (mtime, size) so an edited or re-downloaded file is parsed again.
+    with open(path, encoding="utf-8", errors="ignore") as handle:
+        return tuple(parse_tle_lines(handle))
 
 
 def load_tle_catalog(source: str, *, cache_dir: Optional[Path] = None, cache_ttl_hours: float = 24.0) -> List[SatelliteRecord]:
@@ -114,13 +134,13 @@ def load_tle_catalog(source: str, *, cache_dir: Optional[Path] = None, cache_ttl
     cache_dir = cache_dir or Path("data/cache")
 
     if re.match(r"^https?://", source):
-        lines = _load_with_cache(source, cache_dir, cache_ttl_hours)
+        path = _load_with_cache(source, cache_dir, cache_ttl_hours)
     else:
         path = Path(source)
         if not path.exists():
             raise FileNotFoundError(f"TLE source not found: {source}")
-        lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
-    return parse_tle_lines(lines)
+    stat = path.stat()
+    return list(_parse_tle_file(str(path.resolve()), stat.st_mtime_ns, stat.st_size))
 
 
 def sample_leo_constellations(
@@ -182,7 +202,8 @@ def sample_leo_constellations(
         selection.extend(rng.sample(candidates, min(count, len(candidates))))
 
     if len(selection) < n_sats:
-        pool = [rec for rec in leo if rec not in selection]
+        chosen = set(selection)
+        pool = [rec for rec in leo if rec not in chosen]
         if pool:
             selection.extend(rng.sample(pool, min(n_sats - len(selection), len(pool))))
 
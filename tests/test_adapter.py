@@ -0,0 +1,42 @@
+import pytest
+
+from scrap_hypatia.adapter import HypatiaTransport
+
+
+class _RecordingSim:
+    now = 3
+
+    def __init__(self):
+        self.injected = []
+
+    def on_delivery(self, cb):
+        self.deliver = cb
+
+    def inject_packet(self, pkt):
+        self.injected.append(pkt)
+
+
+def test_send_many_matches_send():
+    sim = _RecordingSim()
+    transport = HypatiaTransport(sim)
+    received = []
+    transport.register_receiver(b"gs", lambda src, dst, payload, meta: received.append(meta))
+
+    meta = {"job_id": 1}
+    transport.send(src=b"sat", dst=b"gs", payload=b"x", meta=meta)
+    transport.send_many([b"sat"], [b"gs"], [b"x"], [meta])
+    single, batched = sim.injected
+    assert single == batched
+    assert single.meta == {"job_id": 1, "t_inject": 3}
+    assert meta == {"job_id": 1}
+
+    sim.deliver(single)
+    assert received == [{"job_id": 1, "t_inject": 3, "t_deliver": 3}]
+
+
+def test_send_many_rejects_mismatched_lengths():
+    sim = _RecordingSim()
+    transport = HypatiaTransport(sim)
+    with pytest.raises(ValueError):
+        transport.send_many([b"a", b"b"], [b"gs"], [b"x", b"y"])
+    assert sim.injected == []
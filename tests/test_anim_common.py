@@ -0,0 +1,54 @@
+import pytest
+
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("matplotlib")
+
+
+from tools._anim_common import is_up_to_date, record_signature, render_signature, thin_time_space
+from tools.common_log import LogEvent
+
+
+def _columns(n, n_nodes=4, n_kinds=3, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.sort(rng.uniform(0.0, 1000.0, n))
+    return t, rng.integers(0, n_nodes, n), rng.integers(0, n_kinds, n)
+
+
+def test_thin_time_space_keeps_everything_under_budget():
+    t, node, kind = _columns(100)
+    assert np.array_equal(thin_time_space(t, node, kind, 100), np.arange(100))
+    assert np.array_equal(thin_time_space(t, node, kind, 0), np.arange(100))
+
+
+def test_thin_time_space_meets_budget_in_time_order():
+    t, node, kind = _columns(50_000)
+    keep = thin_time_space(t, node, kind, 2_000)
+    assert 0 < len(keep) <= 2_000
+    assert np.all(np.diff(keep) > 0)
+    # Every (node, kind) row that had points still has some.
+    assert set(zip(node.tolist(), kind.tolist())) == set(zip(node[keep].tolist(), kind[keep].tolist()))
+    # Thinning keeps points spread over the whole log, not just its start.
+    assert t[keep[-1]] > 0.95 * t[-1]
+
+
+def test_render_signature_tracks_events_and_params():
+    events = [LogEvent(0.0, {"event": "task_created", "task_id": 1}), LogEvent(2.5, {"event": "task_completed"})]
+    signature = render_signature(events, view="ring", fps=24, tbin=10.0)
+    assert signature == render_signature(list(events), tbin=10.0, fps=24, view="ring")
+    assert signature != render_signature(events, view="ring", fps=30, tbin=10.0)
+    assert signature != render_signature(events[:1], view="ring", fps=24, tbin=10.0)
+    moved = [events[0], LogEvent(3.0, events[1].payload)]
+    assert signature != render_signature(moved, view="ring", fps=24, tbin=10.0)
+
+
+def test_is_up_to_date_needs_output_and_matching_signature(tmp_path):
+    out = tmp_path / "ring.gif"
+    assert not is_up_to_date(out, "abc")
+    out.write_bytes(b"GIF89a")
+    assert not is_up_to_date(out, "abc")
+    record_signature(out, "abc")
+    assert is_up_to_date(out, "abc")
+    assert not is_up_to_date(out, "abd")
+    out.unlink()
+    assert not is_up_to_date(out, "abc")
@@ -0,0 +1,29 @@
+import pytest
+
+from tools.common_log import parse_node_id
+
+
+@pytest.mark.parametrize(
+    ("node_id", "expected"),
+    [
+        ("sat3", ("sat", 3)),
+        ("sat-12", ("sat", 12)),
+        (" SAT7 ", ("sat", 7)),
+        ("sat--3", ("sat", 3)),
+        ("gs", ("gs", 0)),
+        ("GS1", ("gs", 1)),
+        ("gs_4", ("gs", 4)),
+        ("ground", ("gs", 0)),
+        ("ground-2", ("gs", 2)),
+        ("ground_station_2", ("gs", 2)),
+        ("gsx", ("gs", 0)),
+    ],
+)
+def test_parse_node_id(node_id, expected):
+    assert parse_node_id(node_id) == expected
+
+
+@pytest.mark.parametrize("node_id", ["sat", "sat_3", "sat x", "relay-1", ""])
+def test_parse_node_id_rejects(node_id):
+    with pytest.raises(ValueError):
+        parse_node_id(node_id)
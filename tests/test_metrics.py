@@ -0,0 +1,52 @@
+import pytest
+
+from analysis.metrics import EventIndex, compute_metrics
+
+
+EVENTS = [
+    {"event": "task_created", "task_id": 1, "t": 0},
+    {"event": "task_created", "task_id": 2, "t": 1},
+    {"event": "task_created", "task_id": 3, "t": 2},
+    {"event": "task_dispatched", "task_id": 1, "t": 0},
+    {"event": "task_dispatched", "task_id": 2, "t": 3},
+    {"event": "task_dispatched", "task_id": 2, "t": 4},
+    {"event": "task_forwarded", "task_id": 1, "t": 1},
+    {"event": "task_forwarded", "task_id": 2, "t": 4},
+    {"event": "task_completed", "task_id": 2, "t": 5},
+    {"event": "task_completed", "task_id": 1, "t": 7},
+    {"event": "deadline_miss", "task_id": 3, "t": 6},
+]
+
+
+def test_compute_metrics_mode_a():
+    metrics = compute_metrics(EVENTS, 10, "A")
+    assert metrics == {
+        "mode": "A",
+        "p50_latency": 4.0,
+        "p90_latency": 7.0,
+        "p99_latency": 7.0,
+        "deadline_miss_rate": pytest.approx(1 / 3),
+        "throughput": 2,
+        "blocked_waiting_ground": 1,
+        "isl_message_count": 0,
+    }
+
+
+def test_compute_metrics_accepts_a_reused_index():
+    index = EventIndex.from_events(EVENTS)
+    assert list(index.latencies) == [4, 7]
+    for mode in ("A", "B"):
+        assert compute_metrics(index, 10, mode) == compute_metrics(iter(EVENTS), 10, mode)
+    assert compute_metrics(index, 10, "B")["isl_message_count"] == 2
+    assert compute_metrics(index, 0, "B")["throughput"] == 0.0
+
+
+def test_compute_metrics_empty_log():
+    metrics = compute_metrics([], 10, "B")
+    assert metrics["p50_latency"] == 0.0
+    assert metrics["deadline_miss_rate"] == 0.0
+
+
+def test_event_index_caches_are_not_constructor_arguments():
+    with pytest.raises(TypeError):
+        EventIndex(_latencies=None)
@@ -1,4 +1,51 @@
-from scrap_hypatia.scap_ffi import version
+import ctypes
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+import adapters.scap_real as scap_real
+import scrap_hypatia.scap_ffi as scap_ffi
+from scrap_hypatia.scap_ffi import _OUT_CAP, ScapOps, load_ops, version
+
+
+def _fake_op(size=None):
+    def op(a, a_len, b, b_len, out, out_cap):
+        digest = hashlib.sha256(a + b"|" + b).digest()
+        ctypes.memmove(out, digest, len(digest))
+        return len(digest) if size is None else size
+
+    return op
+
+
+def _fake_lib(**ops):
+    names = ("scap_issue_token", "scap_make_request", "scap_make_receipt")
+    return SimpleNamespace(**{name: ops.get(name, _fake_op()) for name in names}, scap_verify_receipt=lambda *a: 0)
+
 
 def test_scap_ffi_version():
     assert version() == "1.0.0"
+
+
+def test_scap_ops_rejects_oversized_output():
+    ops = ScapOps(_fake_lib(scap_make_receipt=_fake_op(size=_OUT_CAP + 1)))
+    assert len(ops.make_request(b"token", b"binding")) == 32
+    with pytest.raises(RuntimeError):
+        ops.make_receipt(b"req", b"result")
+
+
+def test_real_client_binds_task_params(monkeypatch):
+    monkeypatch.setattr(scap_real, "load_ops", lambda: ScapOps(_fake_lib()))
+    client = scap_real.ScrapClient()
+    token = client.issue_capability_token("sat-1", ["compute"], {"ttl": 5})
+    first = client.make_bound_task_request(token, b"\x01" * 32, {"job": 1})
+    second = client.make_bound_task_request(token, b"\x01" * 32, {"job": 2})
+    assert first != second
+    assert first == client.make_bound_task_request(token, b"\x01" * 32, {"job": 1})
+
+
+def test_load_ops_without_exports(monkeypatch):
+    # A library that loads but exports none of the SCAP symbols (e.g. the wrong .so).
+    monkeypatch.setattr(scap_ffi, "_LIBS", {})
+    monkeypatch.setattr(scap_ffi.ctypes, "CDLL", lambda path: SimpleNamespace())
+    assert load_ops() is None
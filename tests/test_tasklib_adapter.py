@@ -1,3 +1,7 @@
+import gc
+import json
+from pathlib import Path
+
 import pytest
 
 
@@ -15,3 +19,42 @@ def test_tasklib_receipt_roundtrip():
 
     assert client.verify_receipt(receipt, req)
     assert receipt.startswith(b"TL_RCPT:")
+
+
+class _FakeTaskWarrior:
+    def __init__(self, data_location, taskrc_location, create):
+        self.imports = []
+
+    def execute_command(self, args):
+        assert args[0] == "import"
+        self.imports.append(json.loads(Path(args[1]).read_text(encoding="utf-8")))
+
+
+def test_tasklib_batched_import(monkeypatch, tmp_path):
+    monkeypatch.setattr(tasklib, "TaskWarrior", _FakeTaskWarrior)
+    client = ScrapClient(tmp_path, synchronous=False, batch_size=2)
+
+    client.issue_capability_token("alice", ["read"], {"scope": "demo"})
+    assert client._tw.imports == []
+    token = client.issue_capability_token("bob", ["read"], {"scope": "demo"})
+    assert len(client._tw.imports) == 1
+
+    client.make_bound_task_request(token, b"payment", {"job": "demo"})
+    client.flush()
+    first, second = client._tw.imports
+    assert [task["tags"] for task in first] == [["scrap", "capability"], ["scrap", "capability"]]
+    assert json.loads(first[1]["annotations"][0]["description"])["subject"] == "bob"
+    assert [task["description"] for task in second] == ["SCRAP request"]
+    assert all(task["status"] == "pending" for task in first + second)
+    assert not (tmp_path / "scrap_import.json").exists()
+
+
+def test_tasklib_flushes_on_collection(monkeypatch, tmp_path):
+    monkeypatch.setattr(tasklib, "TaskWarrior", _FakeTaskWarrior)
+    client = ScrapClient(tmp_path, synchronous=False)
+    client.issue_capability_token("alice", ["read"], {"scope": "demo"})
+    tw = client._tw
+
+    del client
+    gc.collect()
+    assert [len(batch) for batch in tw.imports] == [1]
@@ -0,0 +1,416 @@
+"""Preprocessing, side panels and output helpers shared by the Experiment 001 animations."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import math
+import multiprocessing
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from operator import attrgetter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from PIL import Image
+
+from .common_log import LogEvent, parse_node_id
+
+try:
+    import imageio_ffmpeg
+except ImportError:
+    imageio_ffmpeg = None
+
+
+TIME_SPACE_COLORS = {
+    "inject": "#4C78A8",
+    "task_created": "#4C78A8",
+    "token_issued": "#A0CBE8",
+    "forward": "#F58518",
+    "task_dispatched": "#F58518",
+    "task_forwarded": "#FFBE7D",
+    "deliver": "#54A24B",
+    "token_validated": "#54A24B",
+    "task_accepted": "#72B7B2",
+    "complete": "#B79A20",
+    "task_completed": "#B79A20",
+    "receipt_emitted": "#E45756",
+    "deadline_miss": "#E45756",
+}
+
+COMPLETION_EVENTS = {"complete", "task_completed"}
+
+TIME_SPACE_RGBA = {name: to_rgba(color) for name, color in TIME_SPACE_COLORS.items()}
+_OTHER_RGBA = to_rgba("#999999")
+
+
+@dataclass
+class EventColumns:
+    """Per-event columns of a time-ordered log, decoded in a single pass.
+
+    ``t`` is relative to the first event and ``kind`` indexes ``kinds`` (-1 for
+    untyped events). ``node`` (executor, else dst, else src), ``src`` and ``dst``
+    are time-space rows, satellites first and then ground stations; -1 marks a
+    missing or out-of-range id.
+    """
+
+    t: np.ndarray
+    kind: np.ndarray
+    node: np.ndarray
+    src: np.ndarray
+    dst: np.ndarray
+    kinds: List[str]
+
+    def is_kind(self, names: Iterable[str]) -> np.ndarray:
+        names = set(names)
+        return np.isin(self.kind, [code for code, name in enumerate(self.kinds) if name in names])
+
+    def kind_rgba(self) -> np.ndarray:
+        """Time-space colour of every event type, indexed like ``kinds``."""
+        return np.array([TIME_SPACE_RGBA.get(name, _OTHER_RGBA) for name in self.kinds], dtype=float).reshape(-1, 4)
+
+
+def to_columns(events: List[LogEvent], n_sats: int, n_gs: int) -> EventColumns:
+    codes: Dict[str, int] = {}
+    rows: Dict[str, int] = {}
+
+    def row(node) -> int:
+        if not node:
+            return -1
+        found = rows.get(node)
+        if found is None:
+            try:
+                kind, idx = parse_node_id(node)
+            except ValueError:
+                found = -1
+            else:
+                if kind == "sat":
+                    found = idx if idx < n_sats else -1
+                else:
+                    found = n_sats + idx if idx < n_gs else -1
+            rows[node] = found
+        return found
+
+    times: List[float] = []
+    kind: List[int] = []
+    node: List[int] = []
+    src: List[int] = []
+    dst: List[int] = []
+    for ev in events:
+        payload = ev.payload
+        ev_type = payload.get("type") or payload.get("event")
+        times.append(ev.t)
+        kind.append(codes.setdefault(ev_type, len(codes)) if ev_type else -1)
+        src_row = row(payload.get("src"))
+        dst_row = row(payload.get("dst"))
+        executor = payload.get("executor")
+        node.append(row(executor) if executor else dst_row if payload.get("dst") else src_row)
+        src.append(src_row)
+        dst.append(dst_row)
+    t = np.array(times, dtype=float)
+    t -= t[0]
+    return EventColumns(
+        t=t,
+        kind=np.array(kind, dtype=np.int64),
+        node=np.array(node, dtype=np.int64),
+        src=np.array(src, dtype=np.int64),
+        dst=np.array(dst, dtype=np.int64),
+        kinds=list(codes),
+    )
+
+
+def bin_events(times: np.ndarray, tbin: float, max_time: float) -> Tuple[int, np.ndarray]:
+    """Frame count up to ``max_time`` and the frame of every event (later ones go last)."""
+    bins = int(math.ceil(max_time / tbin)) if max_time > 0 else 1
+    return bins, np.minimum(times // tbin, bins - 1).astype(np.int64)
+
+
+def group_by_bin(bin_idx: np.ndarray, n_bins: int, values: np.ndarray) -> List[np.ndarray]:
+    """Split ``values`` into one array per frame, keeping log order within a frame."""
+    order = np.argsort(bin_idx, kind="stable")
+    counts = np.bincount(bin_idx, minlength=n_bins)
+    return np.split(values[order], np.cumsum(counts)[:-1])
+
+
+def frames_to_draw(n_bins: int, disp_skip: int, *busy: np.ndarray) -> List[int]:
+    """Every ``disp_skip``-th frame, plus every frame listed in one of the ``busy`` bin arrays."""
+    frames = np.arange(n_bins)
+    if disp_skip <= 1:
+        return frames.tolist()
+    keep = frames % disp_skip == 0
+    for bins in busy:
+        keep[bins[bins < n_bins]] = True
+    return frames[keep].tolist()
+
+
+def thin_time_space(t: np.ndarray, node: np.ndarray, kind: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the time-space points to draw, in time order, about ``max_points`` at most.
+
+    Points are bucketed by (time slice, node, event type) and the first of each bucket
+    is kept; slices start far below a pixel wide and double until the budget is met.
+    ``max_points <= 0`` keeps everything.
+    """
+    keep = np.arange(len(t))
+    if max_points <= 0 or len(t) <= max_points:
+        return keep
+    span = float(t[-1] - t[0]) or 1.0
+    n_nodes = int(node.max()) + 1
+    n_kinds = int(kind.max()) + 1
+    dt = span / 4096
+    while len(keep) > max_points and dt <= span:
+        key = ((t // dt).astype(np.int64) * n_nodes + node) * n_kinds + kind
+        _, first = np.unique(key, return_index=True)
+        keep = np.sort(first)
+        dt *= 2
+    return keep
+
+
+class SidePanels:
+    """Time-space diagram and cumulative completion curve drawn next to each animation.
+
+    Everything a frame needs is resolved here up front, so ``draw`` only slices
+    precomputed arrays into the persistent artists listed in ``artists``. Long logs
+    are thinned to about ``max_points`` time-space points; the completion curve
+    always uses every event.
+    """
+
+    def __init__(
+        self,
+        ax_timespace,
+        ax_completion,
+        cols: EventColumns,
+        frame_times: np.ndarray,
+        max_t: float,
+        node_labels: List[str],
+        max_points: int = 0,
+    ) -> None:
+        max_nodes = len(node_labels)
+        ax_timespace.set_title("Time–Space Diagram", fontsize=10)
+        ax_timespace.set_xlabel("Time (s)")
+        ax_timespace.set_ylabel("Node")
+        ax_timespace.set_xlim(0, max_t)
+        ax_timespace.set_ylim(-0.5, max_nodes - 0.5)
+        ax_timespace.set_yticks(range(max_nodes))
+        ax_timespace.set_yticklabels(node_labels, fontsize=7)
+        # All points share one scatter coloured per event type; events are time-ordered,
+        # so every frame shows a prefix of them.
+        on_timespace = np.flatnonzero((cols.kind >= 0) & (cols.node >= 0))
+        on_timespace = on_timespace[
+            thin_time_space(cols.t[on_timespace], cols.node[on_timespace], cols.kind[on_timespace], max_points)
+        ]
+        self._ts_xy = np.column_stack((cols.t[on_timespace], cols.node[on_timespace])).astype(float)
+        ts_kind = cols.kind[on_timespace]
+        kind_rgba = cols.kind_rgba()
+        self._ts_rgba = kind_rgba[ts_kind]
+        self._ts_cut = np.searchsorted(self._ts_xy[:, 0], frame_times, side="right")
+        self._ts_scat = ax_timespace.scatter([], [], s=12, alpha=0.7)
+        codes, first_seen = np.unique(ts_kind, return_index=True)
+        legend_handles = [
+            Line2D(
+                [], [], linestyle="", marker="o", markersize=4, color=kind_rgba[code], alpha=0.7, label=cols.kinds[code]
+            )
+            for code in codes[np.argsort(first_seen)]
+        ]
+        if legend_handles:
+            ax_timespace.legend(handles=legend_handles, loc="upper left", fontsize=6, frameon=False, ncol=2)
+
+        completion_times = np.sort(cols.t[cols.is_kind(COMPLETION_EVENTS)])
+        ax_completion.set_title("Cumulative Completions", fontsize=10)
+        ax_completion.set_xlabel("Time (s)")
+        ax_completion.set_ylabel("Completed")
+        ax_completion.set_xlim(0, max_t)
+        ax_completion.set_ylim(0, max(1, len(completion_times) + 1))
+        self._completion_times = completion_times
+        self._completion_cut = np.searchsorted(completion_times, frame_times, side="right")
+        self._completion_count = np.arange(1, len(completion_times) + 1)
+        (self._comp_line,) = ax_completion.step([], [], where="post", color="#2ca02c")
+        self._comp_dot = ax_completion.scatter([0], [0], color="#2ca02c", s=20)
+
+        self.artists = [self._ts_scat, self._comp_line, self._comp_dot]
+
+    def draw(self, frame_idx: int, t_now: float) -> None:
+        shown = self._ts_cut[frame_idx]
+        self._ts_scat.set_offsets(self._ts_xy[:shown])
+        self._ts_scat.set_facecolors(self._ts_rgba[:shown])
+
+        k = self._completion_cut[frame_idx]
+        self._comp_line.set_data(self._completion_times[:k], self._completion_count[:k])
+        self._comp_dot.set_offsets([[t_now, k]])
+
+
+def render_signature(events: List[LogEvent], **params) -> str:
+    """Content hash of the events and the render parameters that shape the output."""
+    key = hashlib.blake2b(digest_size=16)
+    key.update(np.asarray([ev.t for ev in events], dtype=float).tobytes())
+    key.update(json.dumps([ev.payload for ev in events], sort_keys=True, default=str).encode())
+    key.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return key.hexdigest()
+
+
+def _signature_path(out_path: Path) -> Path:
+    return out_path.with_suffix(out_path.suffix + ".sig")
+
+
+def is_up_to_date(out_path: Path, signature: str) -> bool:
+    """Whether ``out_path`` was last rendered from inputs with this signature."""
+    sig_path = _signature_path(out_path)
+    return out_path.exists() and sig_path.exists() and sig_path.read_text(encoding="utf-8") == signature
+
+
+def record_signature(out_path: Path, signature: str) -> None:
+    _signature_path(out_path).write_text(signature, encoding="utf-8")
+
+
+def new_figure(figsize: Tuple[float, float]) -> Figure:
+    """A figure on its own Agg canvas, independent of pyplot and the configured backend."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_path() -> str | None:
+    """The ffmpeg binary matplotlib is configured with, else imageio-ffmpeg's bundled one."""
+    found = shutil.which(matplotlib.rcParams["animation.ffmpeg_path"])
+    if found is None and imageio_ffmpeg is not None:
+        try:
+            found = imageio_ffmpeg.get_ffmpeg_exe()
+        except RuntimeError:
+            found = None
+    return found
+
+
+class _FFmpegFrames:
+    """Pipes raw RGBA frames into ffmpeg: H.264 for ``.mp4``, a palette-optimised GIF otherwise."""
+
+    def __init__(self, out_path: Path, fps: int) -> None:
+        self._out_path = out_path
+        self._fps = fps
+        self._proc: subprocess.Popen | None = None
+
+    def open(self, width: int, height: int) -> None:
+        cmd = [ffmpeg_path(), "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{width}x{height}"]
+        cmd += ["-pix_fmt", "rgba", "-framerate", str(self._fps), "-loglevel", "error", "-i", "pipe:"]
+        if self._out_path.suffix == ".mp4":
+            # yuv420p keeps the file playable everywhere but needs even dimensions.
+            cmd += ["-vcodec", "h264", "-pix_fmt", "yuv420p", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        else:
+            cmd += ["-filter_complex", "split [a][b];[a] palettegen [p];[b][p] paletteuse"]
+        self._proc = subprocess.Popen(cmd + ["-y", str(self._out_path)], stdin=subprocess.PIPE)
+
+    def write(self, rgba: memoryview) -> None:
+        self._proc.stdin.write(rgba)
+
+    def close(self) -> None:
+        self._proc.stdin.close()
+        if self._proc.wait():
+            raise subprocess.CalledProcessError(self._proc.returncode, self._proc.args)
+
+
+class _PillowFrames:
+    """Collects frames and saves them as a looping GIF with Pillow."""
+
+    def __init__(self, out_path: Path, fps: int) -> None:
+        self._out_path = out_path
+        self._fps = fps
+        self._size = (0, 0)
+        self._frames: List[Image.Image] = []
+
+    def open(self, width: int, height: int) -> None:
+        self._size = (width, height)
+
+    def write(self, rgba: memoryview) -> None:
+        self._frames.append(Image.frombuffer("RGBA", self._size, rgba, "raw", "RGBA", 0, 1).convert("RGB"))
+
+    def close(self) -> None:
+        self._frames[0].save(
+            self._out_path,
+            save_all=True,
+            append_images=self._frames[1:],
+            duration=int(1000 / self._fps),
+            loop=0,
+        )
+
+
+def writer_for_output(out_path: Path, fps: int):
+    """Final path and frame writer: ffmpeg for MP4 (GIF for other suffixes), else a Pillow GIF."""
+    if ffmpeg_path() is not None:
+        final_path = out_path if out_path.suffix == ".mp4" else out_path.with_suffix(".gif")
+        return final_path, _FFmpegFrames(final_path, fps)
+    final_path = out_path.with_suffix(".gif")
+    return final_path, _PillowFrames(final_path, fps)
+
+
+def save_animation(
+    fig: Figure, artists: List, draw_frame: Callable[[int], None], frames: Iterable[int], writer
+) -> None:
+    """Write ``frames`` through ``writer``, drawing the figure's static parts only once.
+
+    ``artists`` are marked animated and left out of a single full draw that becomes
+    the background. So that frames match a full redraw, the spines, texts and legend
+    of their axes (which may sit on top of them) are redrawn with them, in the order
+    a full draw would use. Each frame restores the background, lets ``draw_frame``
+    update the artists and draws just that layer before handing the RGBA buffer to
+    the writer.
+    """
+    canvas = fig.canvas
+    animated = set(artists)
+    layers = []
+    for ax in dict.fromkeys(artist.axes for artist in artists):
+        # Axes.draw leaves the spines out when the axis is switched off.
+        overlays = {*ax.texts, *(ax.spines.values() if ax.axison else ()), ax.get_legend()}
+        children = [child for child in ax.get_children() if child in animated or child in overlays]
+        layers += sorted(children, key=attrgetter("zorder"))
+    for artist in layers:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    width, height = canvas.get_width_height()
+    writer.open(width, height)
+    try:
+        for frame_idx in frames:
+            canvas.restore_region(background)
+            draw_frame(frame_idx)
+            for artist in layers:
+                fig.draw_artist(artist)
+            writer.write(canvas.buffer_rgba())
+    finally:
+        writer.close()
+
+
+def _render_segment(render: Callable[..., Path], render_kwargs: dict, task: Tuple[int, int, Path]) -> None:
+    """Pool worker: render frames [start, stop) of the animation to one MP4 segment."""
+    start, stop, segment_path = task
+    render(**render_kwargs, out_path=segment_path, frame_range=(start, stop))
+
+
+def render_parallel(
+    render: Callable[..., Path], render_kwargs: dict, n_frames: int, workers: int, final_path: Path
+) -> Path:
+    """Render contiguous frame ranges in worker processes and join them with ffmpeg's concat demuxer.
+
+    Frames only depend on their index, so each worker calls ``render`` (a module-level
+    function, so it pickles by name) on its own range; the segments are concatenated
+    without re-encoding.
+    """
+    workers = min(workers, n_frames)
+    bounds = [n_frames * k // workers for k in range(workers + 1)]
+    with tempfile.TemporaryDirectory(prefix="scrap_anim_") as tmp:
+        tmp_dir = Path(tmp)
+        tasks = [(bounds[k], bounds[k + 1], tmp_dir / f"segment_{k:04d}.mp4") for k in range(workers)]
+        with multiprocessing.Pool(processes=workers) as pool:
+            pool.map(functools.partial(_render_segment, render, render_kwargs), tasks)
+        listing = tmp_dir / "segments.txt"
+        listing.write_text("".join(f"file '{path}'\n" for _, _, path in tasks), encoding="utf-8")
+        cmd = [ffmpeg_path(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0"]
+        subprocess.run(cmd + ["-i", str(listing), "-c", "copy", str(final_path)], check=True)
+    return final_path
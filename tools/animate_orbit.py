@@ -4,33 +4,31 @@ from __future__ import annotations
 
 import argparse
 import math
+import os
 import random
-from bisect import bisect_right
 from pathlib import Path
 from typing import Dict, List, Tuple
 
-import matplotlib.pyplot as plt
-from matplotlib import animation
-
-from .common_log import LogEvent, load_events, parse_node_id
-
-TIME_SPACE_COLORS = {
-    "inject": "#4C78A8",
-    "task_created": "#4C78A8",
-    "token_issued": "#A0CBE8",
-    "forward": "#F58518",
-    "task_dispatched": "#F58518",
-    "task_forwarded": "#FFBE7D",
-    "deliver": "#54A24B",
-    "token_validated": "#54A24B",
-    "task_accepted": "#72B7B2",
-    "complete": "#B79A20",
-    "task_completed": "#B79A20",
-    "receipt_emitted": "#E45756",
-    "deadline_miss": "#E45756",
-}
-
-COMPLETION_EVENTS = {"complete", "task_completed"}
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.patches import Circle
+
+from ._anim_common import (
+    COMPLETION_EVENTS,
+    SidePanels,
+    bin_events,
+    frames_to_draw,
+    group_by_bin,
+    is_up_to_date,
+    new_figure,
+    record_signature,
+    render_parallel,
+    render_signature,
+    save_animation,
+    to_columns,
+    writer_for_output,
+)
+from .common_log import LogEvent, load_events
 
 
 def _ground_positions() -> Dict[str, Tuple[float, float]]:
@@ -46,30 +44,11 @@ def _sat_phase(n_sats: int, seed: int | None) -> List[float]:
     return [2 * math.pi * i / n_sats + rng.uniform(-0.1, 0.1) for i in range(n_sats)]
 
 
-def _sat_positions(phases: List[float], t: float, radius: float, period: float) -> Dict[str, Tuple[float, float]]:
+def _sat_positions(phases: List[float], times: np.ndarray, radius: float, period: float) -> np.ndarray:
+    """Satellite (x, y) for every time in ``times``, shaped (len(times), n_sats, 2)."""
     omega = 2 * math.pi / period
-    positions: Dict[str, Tuple[float, float]] = {}
-    for i, phase in enumerate(phases):
-        angle = phase + omega * t
-        positions[f"sat{i}"] = (radius * math.cos(angle), radius * math.sin(angle))
-    return positions
-
-
-def _bin_events(events: List[LogEvent], tbin: float, max_time: float) -> List[List[LogEvent]]:
-    bins = int(math.ceil(max_time / tbin)) if max_time > 0 else 1
-    grouped: List[List[LogEvent]] = [[] for _ in range(bins)]
-    for ev in events:
-        idx = min(int(ev.t // tbin), bins - 1)
-        grouped[idx].append(ev)
-    return grouped
-
-
-def _writer_for_output(out_path: Path, fps: int):
-    if out_path.suffix == ".mp4":
-        if animation.writers.is_available("ffmpeg"):
-            return animation.FFMpegWriter(fps=fps)
-        return None
-    return None
+    angles = np.asarray(phases)[None, :] + omega * np.asarray(times)[:, None]
+    return np.stack((radius * np.cos(angles), radius * np.sin(angles)), axis=-1)
 
 
 def render(
@@ -82,161 +61,148 @@ def render(
     tbin: float,
     duration: float | None,
     seed: int | None,
+    max_points: int = 20000,
+    disp_skip: int = 1,
+    workers: int = 1,
+    frame_range: Tuple[int, int] | None = None,
+    force: bool = False,
 ) -> Path:
     if not events:
         raise ValueError("No events to animate.")
 
-    start_t = events[0].t
-    events = [LogEvent(t=e.t - start_t, payload=e.payload) for e in events]
-    max_t = events[-1].t if duration is None else min(duration, events[-1].t)
-    bins = _bin_events(events, tbin, max_t)
+    final_path, writer = writer_for_output(out_path, fps)
+    params = dict(
+        n_sats=n_sats,
+        n_gs=n_gs,
+        fps=fps,
+        tbin=tbin,
+        duration=duration,
+        max_points=max_points,
+        disp_skip=disp_skip,
+        seed=seed,
+    )
+    # Whole renders are skipped when the same inputs already produced final_path.
+    signature = None
+    if frame_range is None:
+        signature = render_signature(events, view="orbit", **params)
+        if not force and is_up_to_date(final_path, signature):
+            return final_path
+
+    cols = to_columns(events, n_sats, n_gs)
+    max_t = cols.t[-1] if duration is None else min(duration, cols.t[-1])
+    n_bins, bin_idx = bin_events(cols.t, tbin, max_t)
+    frame_times = np.arange(n_bins) * tbin
+    # Frames skipped by disp_skip never hold events or a completion flash.
+    is_completion = cols.is_kind(COMPLETION_EVENTS)
+    done_bins = bin_idx[is_completion]
+    frames = frames_to_draw(n_bins, disp_skip, bin_idx, done_bins + 1, done_bins + 2)
+
+    if frame_range is None and workers > 1 and len(frames) > 1 and final_path.suffix == ".mp4":
+        # Every segment must draw the same satellite phases, so pick the seed here.
+        segment_params = dict(params, seed=random.randrange(2**32) if seed is None else seed)
+        render_parallel(render, dict(events=events, **segment_params), len(frames), workers, final_path)
+        record_signature(final_path, signature)
+        return final_path
 
     phases = _sat_phase(n_sats, seed)
+    sat_track = _sat_positions(phases, frame_times, radius=1.35, period=5400.0)
     ground = _ground_positions()
-    completed = 0
-    missed = 0
-    flash_nodes: Dict[str, float] = {}
+    ground_xy = np.array(list(ground.values()), dtype=float).reshape(-1, 2)
+    sat_names = [f"sat{i}" for i in range(n_sats)]
+    # Links and markers index a per-frame (sats + drawn ground stations) position table.
+    n_drawn = n_sats + len(ground)
+
+    def drawn(rows: np.ndarray) -> np.ndarray:
+        return (rows >= 0) & (rows < n_drawn)
 
     node_labels = [f"sat{i}" for i in range(n_sats)] + [f"gs{i}" for i in range(n_gs)]
-    max_nodes = len(node_labels)
-    time_space_events = []
-    completion_times = []
-    for ev in events:
-        payload = ev.payload
-        ev_type = payload.get("type") or payload.get("event")
-        if ev_type in COMPLETION_EVENTS:
-            completion_times.append(ev.t)
-        node = payload.get("executor") or payload.get("dst") or payload.get("src")
-        if not node or not ev_type:
-            continue
-        try:
-            kind, idx = parse_node_id(node)
-        except ValueError:
-            continue
-        node_index = idx if kind == "sat" else n_sats + idx
-        if 0 <= node_index < max_nodes:
-            time_space_events.append((ev.t, node_index, ev_type))
-    completion_times.sort()
-
-    fig = plt.figure(figsize=(11, 6))
+
+    # Resolve every frame's links, misses, flashes and counters up front so that a
+    # frame only depends on its index; completed sats flash for the next two frames.
+    is_miss = cols.is_kind({"deadline_miss"})
+    completed_at = np.cumsum(np.bincount(bin_idx[is_completion], minlength=n_bins))
+    missed_at = np.cumsum(np.bincount(bin_idx[is_miss], minlength=n_bins))
+
+    is_link = cols.is_kind({"inject", "forward", "deliver"}) & drawn(cols.src) & drawn(cols.dst)
+    link_rows = group_by_bin(
+        bin_idx[is_link], n_bins, np.column_stack((cols.src[is_link], cols.dst[is_link]))
+    )
+    is_marked = is_miss & drawn(cols.node)
+    miss_rows = group_by_bin(bin_idx[is_marked], n_bins, cols.node[is_marked])
+
+    flashing = np.zeros((n_bins, n_sats), dtype=bool)
+    done = is_completion & (cols.node >= 0) & (cols.node < n_sats)
+    for lag in (1, 2):
+        flash_bins = bin_idx[done] + lag
+        keep = flash_bins < n_bins
+        flashing[flash_bins[keep], cols.node[done][keep]] = True
+
+    fig = new_figure((11, 6))
     grid = fig.add_gridspec(2, 2, width_ratios=[2.2, 1.4], height_ratios=[1.3, 1.0])
     ax_orbit = fig.add_subplot(grid[:, 0])
     ax_timespace = fig.add_subplot(grid[0, 1])
     ax_completion = fig.add_subplot(grid[1, 1])
+
+    # Static artists are drawn once; the ones below them are updated in place.
     ax_orbit.set_xlim(-2.0, 2.0)
     ax_orbit.set_ylim(-2.0, 2.0)
     ax_orbit.axis("off")
+    ax_orbit.add_patch(Circle((0, 0), 1.0, color="#ddeef7", fill=False, linewidth=1.0))
+    for name, (x, y) in ground.items():
+        ax_orbit.scatter([x], [y], s=60, color="#444444")
+        ax_orbit.text(x + 0.03, y + 0.03, name, fontsize=8, color="#333333")
+
+    sat_scat = ax_orbit.scatter(np.zeros(n_sats), np.zeros(n_sats), s=30, color="#1f77b4")
+    sat_texts = [ax_orbit.text(0, 0, name, fontsize=7, color="#333333") for name in sat_names]
+    link_lines = LineCollection([], colors="#ff7f0e", linewidths=1.5, alpha=0.8)
+    ax_orbit.add_collection(link_lines)
+    link_heads = ax_orbit.scatter([], [], s=25, color="#ff7f0e", alpha=0.8)
+    miss_scat = ax_orbit.scatter([], [], s=80, color="#d62728", alpha=0.8)
+    t_text = ax_orbit.text(-1.9, 1.8, "", fontsize=10)
+    completed_text = ax_orbit.text(-1.9, 1.65, "", fontsize=9)
+    missed_text = ax_orbit.text(-1.9, 1.5, "", fontsize=9)
+
+    panels = SidePanels(ax_timespace, ax_completion, cols, frame_times, max_t, node_labels, max_points)
+
+    artists = [
+        sat_scat,
+        *sat_texts,
+        link_lines,
+        link_heads,
+        miss_scat,
+        t_text,
+        completed_text,
+        missed_text,
+        *panels.artists,
+    ]
+
+    def draw_frame(frame_idx: int) -> None:
+        t_now = frame_idx * tbin
+        sat_xy = sat_track[frame_idx]
 
-    def draw_frame(frame_idx: int):
-        nonlocal completed, missed
-        ax_orbit.clear()
-        ax_timespace.clear()
-        ax_completion.clear()
-        ax_orbit.set_xlim(-2.0, 2.0)
-        ax_orbit.set_ylim(-2.0, 2.0)
-        ax_orbit.axis("off")
+        sat_scat.set_offsets(sat_xy)
+        sat_scat.set_color(["#2ca02c" if flash else "#1f77b4" for flash in flashing[frame_idx]])
+        for text, (x, y) in zip(sat_texts, sat_xy):
+            text.set_position((x + 0.03, y + 0.03))
 
-        # Earth
-        earth = plt.Circle((0, 0), 1.0, color="#ddeef7", fill=False, linewidth=1.0)
-        ax_orbit.add_patch(earth)
+        positions = np.concatenate((sat_xy, ground_xy))
+        segments = positions[link_rows[frame_idx]]
+        link_lines.set_segments(segments)
+        link_heads.set_offsets(segments[:, 1])
+        miss_scat.set_offsets(positions[miss_rows[frame_idx]])
 
-        t_now = frame_idx * tbin
-        sat_positions = _sat_positions(phases, t_now, radius=1.35, period=5400.0)
-
-        for name, (x, y) in sat_positions.items():
-            color = "#1f77b4"
-            if name in flash_nodes and frame_idx - flash_nodes[name] <= 2:
-                color = "#2ca02c"
-            ax_orbit.scatter([x], [y], s=30, color=color)
-            ax_orbit.text(x + 0.03, y + 0.03, name, fontsize=7, color="#333333")
-
-        for name, (x, y) in ground.items():
-            ax_orbit.scatter([x], [y], s=60, color="#444444")
-            ax_orbit.text(x + 0.03, y + 0.03, name, fontsize=8, color="#333333")
-
-        if frame_idx < len(bins):
-            for ev in bins[frame_idx]:
-                payload = ev.payload
-                ev_type = payload.get("type") or payload.get("event")
-                src = payload.get("src")
-                dst = payload.get("dst")
-                positions = {**sat_positions, **ground}
-                if ev_type in {"inject", "forward", "deliver"} and src and dst:
-                    if src in positions and dst in positions:
-                        xa, ya = positions[src]
-                        xb, yb = positions[dst]
-                        ax_orbit.plot([xa, xb], [ya, yb], color="#ff7f0e", linewidth=1.5, alpha=0.8)
-                        ax_orbit.scatter([xb], [yb], s=25, color="#ff7f0e", alpha=0.8)
-                if ev_type in COMPLETION_EVENTS:
-                    node = payload.get("executor") or dst or src
-                    if node:
-                        flash_nodes[node] = frame_idx
-                        completed += 1
-                if ev_type == "deadline_miss":
-                    node = payload.get("executor") or dst or src
-                    if node and node in positions:
-                        ax_orbit.scatter(
-                            [positions[node][0]],
-                            [positions[node][1]],
-                            s=80,
-                            color="#d62728",
-                            alpha=0.8,
-                        )
-                        missed += 1
-
-        ax_orbit.text(-1.9, 1.8, f"t={int(t_now)}s", fontsize=10)
-        ax_orbit.text(-1.9, 1.65, f"completed={completed}", fontsize=9)
-        ax_orbit.text(-1.9, 1.5, f"missed={missed}", fontsize=9)
-
-        ax_timespace.set_title("Time–Space Diagram", fontsize=10)
-        ax_timespace.set_xlabel("Time (s)")
-        ax_timespace.set_ylabel("Node")
-        ax_timespace.set_xlim(0, max_t)
-        ax_timespace.set_ylim(-0.5, max_nodes - 0.5)
-        ax_timespace.set_yticks(range(max_nodes))
-        ax_timespace.set_yticklabels(node_labels, fontsize=7)
-
-        visible_events = [ev for ev in time_space_events if ev[0] <= t_now]
-        for ev_type in {ev[2] for ev in visible_events}:
-            points = [(ev[0], ev[1]) for ev in visible_events if ev[2] == ev_type]
-            if not points:
-                continue
-            times, nodes = zip(*points)
-            ax_timespace.scatter(
-                times,
-                nodes,
-                s=12,
-                color=TIME_SPACE_COLORS.get(ev_type, "#999999"),
-                alpha=0.7,
-                label=ev_type,
-            )
-        if visible_events:
-            ax_timespace.legend(loc="upper left", fontsize=6, frameon=False, ncol=2)
-
-        ax_completion.set_title("Cumulative Completions", fontsize=10)
-        ax_completion.set_xlabel("Time (s)")
-        ax_completion.set_ylabel("Completed")
-        ax_completion.set_xlim(0, max_t)
-        ax_completion.set_ylim(0, max(1, len(completion_times) + 1))
-        idx = bisect_right(completion_times, t_now)
-        if completion_times:
-            ax_completion.step(
-                completion_times[:idx],
-                list(range(1, idx + 1)),
-                where="post",
-                color="#2ca02c",
-            )
-        ax_completion.scatter([t_now], [idx], color="#2ca02c", s=20)
-
-    ani = animation.FuncAnimation(fig, draw_frame, frames=len(bins), interval=1000 / fps)
-    writer = _writer_for_output(out_path, fps)
-    if writer is not None:
-        ani.save(out_path, writer=writer)
-        return out_path
-
-    gif_path = out_path.with_suffix(".gif")
-    ani.save(gif_path, writer=animation.PillowWriter(fps=fps))
-    return gif_path
+        t_text.set_text(f"t={int(t_now)}s")
+        completed_text.set_text(f"completed={completed_at[frame_idx]}")
+        missed_text.set_text(f"missed={missed_at[frame_idx]}")
+
+        panels.draw(frame_idx, t_now)
+
+    if frame_range is not None:
+        frames = frames[slice(*frame_range)]
+    save_animation(fig, artists, draw_frame, frames, writer)
+    if signature is not None:
+        record_signature(final_path, signature)
+    return final_path
 
 
 def main() -> None:
@@ -249,6 +215,29 @@ def main() -> None:
     ap.add_argument("--tbin", type=float, default=10.0)
     ap.add_argument("--duration", type=float, default=None)
     ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument(
+        "--max-points",
+        type=int,
+        default=20000,
+        help="Thin the time-space panel to about this many points (0 keeps all)",
+    )
+    ap.add_argument(
+        "--disp-skip",
+        type=int,
+        default=1,
+        help="Draw only every Nth frame, keeping frames with events (default: 1, every frame)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes for MP4 rendering (default: CPU count; 1 renders serially)",
+    )
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="Render even if the output is up to date with the log and options",
+    )
     args = ap.parse_args()
 
     events = load_events(args.log)
@@ -262,7 +251,11 @@ def main() -> None:
         fps=args.fps,
         tbin=args.tbin,
         duration=args.duration,
+        max_points=args.max_points,
+        disp_skip=args.disp_skip,
         seed=args.seed,
+        workers=args.workers or os.cpu_count() or 1,
+        force=args.force,
     )
     print(f"Wrote animation to {final_path}")
 
@@ -3,28 +3,55 @@
 from __future__ import annotations
 
 import json
+import re
+import sys
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 from typing import Any, Iterable, List, Tuple
 
+try:
+    import orjson
 
-@dataclass
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# datetime.fromisoformat understands a trailing "Z" from Python 3.11 on.
+_ISO_ACCEPTS_Z = sys.version_info >= (3, 11)
+# Fast path for the id formats the simulators emit; anything else takes the general parse.
+_NODE_ID = re.compile(r"(?:(sat)-?|gs[-_]?|ground[-_]?)(\d*)", re.IGNORECASE | re.ASCII)
+
+
+@dataclass(slots=True)
 class LogEvent:
     t: float
     payload: dict
 
 
+@lru_cache(maxsize=8192)
+def _parse_iso(value: str) -> float:
+    dt = datetime.fromisoformat(value if _ISO_ACCEPTS_Z else value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
 def _parse_time(value: Any) -> float:
-    if isinstance(value, (int, float)):
+    # Exact type checks first: almost every log stores numeric steps or seconds.
+    kind = type(value)
+    if kind is float:
+        return value
+    if kind is int or isinstance(value, (int, float)):
         return float(value)
     if isinstance(value, str):
         try:
             return float(value)
         except ValueError:
             try:
-                dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
-                return dt.replace(tzinfo=dt.tzinfo or timezone.utc).timestamp()
+                return _parse_iso(value)
             except ValueError:
                 raise ValueError(f"Unsupported time format: {value!r}")
     raise ValueError(f"Unsupported time format: {value!r}")
@@ -33,21 +60,29 @@ def _parse_time(value: Any) -> float:
 def load_events(log_path: str | Path) -> List[LogEvent]:
     path = Path(log_path)
     events: List[LogEvent] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        payload = json.loads(line)
-        t_raw = payload.get("t")
-        if t_raw is None:
-            raise ValueError(f"Event missing time field: {payload}")
-        t_val = _parse_time(t_raw)
-        events.append(LogEvent(t=t_val, payload=payload))
-    events.sort(key=lambda e: e.t)
+    with path.open("rb") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            payload = _loads(line)
+            t_raw = payload.get("t")
+            if t_raw is None:
+                raise ValueError(f"Event missing time field: {payload}")
+            t_val = _parse_time(t_raw)
+            events.append(LogEvent(t=t_val, payload=payload))
+    events.sort(key=attrgetter("t"))
     return events
 
 
 def parse_node_id(node_id: str) -> Tuple[str, int]:
     raw = node_id.strip()
+    match = _NODE_ID.fullmatch(raw)
+    if match is not None:
+        sat, digits = match.groups()
+        if sat is None:
+            return "gs", int(digits) if digits else 0
+        if digits:
+            return "sat", int(digits)
     lower = raw.lower()
     if lower.startswith("sat"):
         idx = int(lower.replace("sat", "").replace("-", ""))
@@ -22,12 +22,23 @@ def main() -> None:
     if args.output:
         output_path = Path(args.output)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        payload = {
-            "steps": [{"edges": []} for _ in range(max(0, int(args.steps)))],
-            "sat_nodes": [f"sat-{i}" for i in range(max(0, int(args.n_sats)))],
-            "ground_nodes": [f"ground-{i}" for i in range(max(0, int(args.n_ground)))],
-        }
-        output_path.write_text(json.dumps(payload), encoding="utf-8")
+        n_steps = max(0, int(args.steps))
+        # Written piecewise with json.dumps' default separators, so large --steps
+        # never materialise a list of step dicts.
+        with output_path.open("w", encoding="utf-8") as f:
+            f.write('{"steps": [')
+            if n_steps:
+                f.write('{"edges": []}')
+                rest = n_steps - 1
+                block = ', {"edges": []}' * min(rest, 4096)
+                for _ in range(rest // 4096):
+                    f.write(block)
+                f.write(', {"edges": []}' * (rest % 4096))
+            f.write('], "sat_nodes": ')
+            f.write(json.dumps([f"sat-{i}" for i in range(max(0, int(args.n_sats)))]))
+            f.write(', "ground_nodes": ')
+            f.write(json.dumps([f"ground-{i}" for i in range(max(0, int(args.n_ground)))]))
+            f.write("}")
         return
 
     parser.error("No action specified. Use --ping or --output.")